@@ -26,6 +26,9 @@ from .pipelines import webpage_processor as _webpage_processor_module
 # Import data module for sample data access
 from . import data
 
+# Concurrent webpage screenshots on the shared browser pool
+from .present import screenshot_batch
+
 # Create the namespace instances after functions are registered
 load = SmartVerbNamespace(_loaders)
 modify = SmartVerbNamespace(_modifiers)
@@ -37,4 +40,5 @@ split = SmartVerbNamespace(_modifiers)  # Split functions are also modifiers
 __all__ = ["Attachment", "AttachmentCollection", "attach", "A", "Pipeline",
            "load", "modify", "present", "adapt", "refine", "split", "data",
            "loader", "modifier", "presenter", "adapter", "refiner",
-           "processor", "processors", "Attachments", "process"]
+           "processor", "processors", "Attachments", "process",
+           "screenshot_batch"]
@@ -92,10 +92,12 @@ def claude(input_obj: Union[Attachment, AttachmentCollection], prompt: str = "")
         if img and isinstance(img, str) and len(img) > 10:  # Basic validation
             # Extract base64 data for Claude
             base64_data = img
+            media_type = "image/png"
             if img.startswith('data:image/'):
                 # Extract just the base64 part after the comma
                 if ',' in img:
-                    base64_data = img.split(',', 1)[1]
+                    header, base64_data = img.split(',', 1)
+                    media_type = header[len('data:'):].split(';', 1)[0]
                 else:
                     continue  # Skip malformed data URLs
             elif img.endswith('_placeholder'):
@@ -105,7 +107,7 @@ def claude(input_obj: Union[Attachment, AttachmentCollection], prompt: str = "")
                 "type": "image",
                 "source": {
                     "type": "base64",
-                    "media_type": "image/png",
+                    "media_type": media_type,
                     "data": base64_data
                 }
             })
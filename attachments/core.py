@@ -197,13 +197,37 @@ class Attachment:
         self.path, self.commands = self._parse_attachy()
         
         self._obj: Optional[Any] = None
-        self.text: str = ""
+        self._text_parts: List[str] = []
         self.images: List[str] = []
         self.audio: List[str] = []
         self.metadata: Dict[str, Any] = {}
+        # pypdfium2 document opened by the PDF presenters; owned (and closed) by this attachment only
+        self._pdfium_doc: Optional[Dict[str, Any]] = None
+        # Rendered DataFrame tables memoized by the presenters (see present._df_rendered)
+        self._df_render_cache: Optional[Dict[str, Any]] = None
+        # pdfplumber page texts shared by the PDF presenters (see present._page_text_cache)
+        self._page_text_cache: Optional[Dict[str, Any]] = None
+        # Slide shape texts shared by the PowerPoint presenters (see present._slide_texts)
+        self._slide_text_cache: Optional[Dict[str, Any]] = None
         
         self.pipeline: List[str] = []
     
+    @property
+    def text(self) -> str:
+        """Text content; fragments added with append_text() are joined on first read."""
+        parts = self._text_parts
+        if len(parts) > 1:
+            parts[:] = ["".join(parts)]
+        return parts[0] if parts else ""
+    
+    @text.setter
+    def text(self, value: str) -> None:
+        self._text_parts = [value]
+    
+    def append_text(self, fragment: str) -> None:
+        """Append to text without copying what is already there."""
+        self._text_parts.append(fragment)
+    
     def _parse_attachy(self) -> tuple[str, Dict[str, str]]:
         if not self.attachy:
             return "", {}
@@ -277,6 +301,16 @@ class Attachment:
     
     def cleanup(self):
         """Clean up any temporary resources associated with this attachment."""
+        # Close a pypdfium2 document shared between PDF presenters; it is often
+        # opened from the temp file below, which Windows won't delete while open
+        pdfium_doc = getattr(self, '_pdfium_doc', None)
+        if pdfium_doc is not None:
+            self._pdfium_doc = None
+            try:
+                pdfium_doc['close']()
+            except Exception:
+                pass
+        
         # Clean up temporary PDF files
         if 'temp_pdf_path' in self.metadata:
             try:
@@ -506,7 +540,8 @@ def _detect_presenter_category(func: Callable, presenter_name: str) -> str:
         source = inspect.getsource(func)
         
         # Count references to text vs image operations
-        text_indicators = source.count('att.text') + source.count('.text ') + source.count('text =')
+        text_indicators = (source.count('att.text') + source.count('.text ') + source.count('text =')
+                           + source.count('append_text('))
         image_indicators = source.count('att.images') + source.count('.images') + source.count('images.append')
         
         if image_indicators > text_indicators:
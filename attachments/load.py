@@ -341,7 +341,7 @@ def git_repo_to_structure(att: Attachment) -> Attachment:
     repo_structure = {
         'type': 'git_repository',
         'path': repo_path,
-        'files': files,
+        'files': files,  # sorted; presenters rely on this order
         'ignore_patterns': ignore_patterns,
         'structure': _get_directory_structure(repo_path, files),
         'metadata': _get_repo_metadata(repo_path)
@@ -394,7 +394,7 @@ def directory_to_structure(att: Attachment) -> Attachment:
     dir_structure = {
         'type': 'directory',
         'path': base_path,
-        'files': files,
+        'files': files,  # sorted; presenters rely on this order
         'ignore_patterns': ignore_patterns if not matchers.glob_pattern_match(att) else [],
         'structure': _get_directory_structure(base_path, files),
         'metadata': _get_directory_metadata(base_path)
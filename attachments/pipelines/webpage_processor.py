@@ -12,7 +12,8 @@ DSL Commands:
     [select:css-selector] - CSS selector to extract specific elements (e.g., h1, .class, #id)
     [viewport:1280x720] - Browser viewport size (default: 1280x720)
     [fullpage:true|false] - Full page screenshot vs viewport only (default: true)
-    [wait:2000] - Wait time in milliseconds for page to settle (default: 200)
+    [wait_until:domcontentloaded] - Navigation readiness: load|domcontentloaded|networkidle|commit (default: domcontentloaded)
+    [wait:2000] - Extra wait in milliseconds for page to settle (default: 0)
 
 Usage:
     # Explicit processor access
@@ -64,7 +65,8 @@ def webpage_to_llm(att: Attachment) -> Attachment:
     - images: true (default), false to control screenshot capture
     - viewport: 1280x720 for browser viewport size
     - fullpage: true (default), false for viewport-only screenshots
-    - wait: 2000 for page settling time in milliseconds
+    - wait_until: domcontentloaded (default), load, networkidle for navigation readiness
+    - wait: 2000 for extra page settling time in milliseconds
     
     Text formats:
     - plain: Clean text extraction from page content
@@ -1,144 +1,435 @@
 from .core import Attachment, presenter
 import io
+import os
+import json
+import re
 import base64
+import shutil
+import tempfile
+import threading
+import subprocess
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from pathlib import Path
+
+try:
+    import pypdfium2 as _pdfium
+except ImportError:
+    _pdfium = None
+
+# pdfium is not thread-safe: every call into a PdfDocument/PdfPage must hold this lock
+_PDFIUM_LOCK = threading.Lock()
+
+# Per-thread scratch buffer for image encoding, reused across pages
+_ENCODE_BUF = threading.local()
 
 # --- PRESENTERS ---
 
 # MARKDOWN PRESENTERS
 @presenter
 def markdown(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
-    """Convert pandas DataFrame to markdown table."""
+    """Convert pandas DataFrame to markdown table (capped at [max_rows:N], default 1000)."""
     try:
-        att.text += f"## Data from {att.path}\n\n"
-        att.text += df.to_markdown(index=False)
-        att.text += f"\n\n*Shape: {df.shape}*\n\n"
+        max_rows = _df_max_rows(att)
+        truncated = len(df) > max_rows
+        render_df = df.head(max_rows) if truncated else df
+        
+        table = _df_rendered(att, df, ('markdown', max_rows),
+                             lambda: _fast_to_markdown(render_df) or render_df.to_markdown(index=False))
+        att.append_text("".join([
+            f"## Data from {att.path}\n\n",
+            table,
+            f"\n\n*Truncated to {max_rows} of {len(df)} rows*" if truncated else "",
+            f"\n\n*Shape: {df.shape}*\n\n",
+        ]))
     except:
         att.text += f"## Data from {att.path}\n\n*Could not convert to markdown*\n\n"
     return att
 
 
+def _df_rendered(att: Attachment, df: 'pandas.DataFrame', key: tuple, render) -> str:
+    """
+    Memoize a DataFrame serialization on the attachment, keyed by format and options.
+    
+    Like the PDF page text cache it holds the DataFrame object itself and
+    checks identity, so a frame replaced by a modifier is rendered afresh
+    (an id() could be reused by a new frame once the old one is freed).
+    The memo lives on a private attribute, not in metadata, so split chunks
+    and adapters never carry it. Full-frame dumps (CSV, TSV) are not
+    memoized: they would keep a second copy of the whole output alive.
+    """
+    cache = att._df_render_cache
+    if cache is None or cache['obj'] is not df:
+        cache = {'obj': df, 'outputs': {}}
+        att._df_render_cache = cache
+    outputs = cache['outputs']
+    if key not in outputs:
+        outputs[key] = render()
+    return outputs[key]
+
+
+def _df_max_rows(att: Attachment) -> int:
+    """Row limit shared by markdown(df) and text(df): [max_rows:N], default 1000."""
+    return int(att.commands.get('max_rows', 1000))
+
+
+# Above this many rows, text(df) with [full_table:true] skips to_string's column padding
+_LARGE_FRAME_ROWS = 10_000
+
+
+def _fast_to_markdown(df: 'pandas.DataFrame') -> 'str | None':
+    """
+    Markdown pipe table built column by column with vectorized string ops.
+    
+    Integer and float columns are formatted with NumPy and right-aligned;
+    other columns, datetimes and durations included, go through pandas' str
+    methods with pipes escaped and newlines flattened. Missing values render
+    as blanks, as in to_markdown(). Cells are not padded to column width,
+    which is most of tabulate's cost. Returns None for a frame without
+    columns so the caller uses to_markdown().
+    """
+    import numpy as np
+    
+    if not len(df.columns):
+        return None
+    
+    cols = []
+    aligns = []
+    for i in range(len(df.columns)):
+        series = df.iloc[:, i]
+        values = series.to_numpy()
+        # Dtype kinds, not issubdtype: NumPy counts timedelta64 ('m') as an integer
+        if values.dtype.kind in 'iu':
+            cols.append(np.char.mod('%d', values).tolist())
+            aligns.append('---:')
+        elif values.dtype.kind == 'f':
+            col = np.char.mod('%.6g', values)
+            col[np.isnan(values)] = ''  # tabulate renders missing values as blanks
+            cols.append(col.tolist())
+            aligns.append('---:')
+        else:
+            col = series.astype(str).str.translate(_MD_CELL_TRANS).where(series.notna(), '')
+            cols.append(col.tolist())
+            aligns.append('---')
+    
+    lines = ["| " + " | ".join(str(c).translate(_MD_CELL_TRANS) for c in df.columns) + " |",
+             "|" + "|".join(aligns) + "|"]
+    lines.extend("| " + " | ".join(row) + " |" for row in zip(*cols))
+    return "\n".join(lines)
+
+
 @presenter
 def markdown(att: Attachment, pdf: 'pdfplumber.PDF') -> Attachment:
     """Convert PDF to markdown with text extraction. Handles scanned PDFs gracefully."""
-    att.text += f"# PDF Document: {att.path}\n\n"
+    parts = [f"# PDF Document: {att.path}\n\n"]
     
     try:
+        pages = pdf.pages
+        n_pages = len(pages)
+        
         # Process ALL pages by default, or only selected pages if specified
-        if 'selected_pages' in att.metadata:
-            pages_to_process = att.metadata['selected_pages']
-        else:
-            # Process ALL pages by default
-            pages_to_process = range(1, len(pdf.pages) + 1)
+        selected = att.metadata.get('selected_pages')
+        pages_to_process = selected if selected is not None else range(1, n_pages + 1)
+        n_to_process = len(pages_to_process)
+        
+        valid_pages = [page_num for page_num in pages_to_process if 1 <= page_num <= n_pages]
         
         total_text_length = 0
         pages_with_text = 0
+        pages_extracted = 0
         
-        for page_num in pages_to_process:
-            if 1 <= page_num <= len(pdf.pages):
-                page = pdf.pages[page_num - 1]
-                page_text = page.extract_text() or ""
-                
-                # Track text statistics
-                if page_text.strip():
-                    pages_with_text += 1
-                    total_text_length += len(page_text.strip())
-                
-                # Only add page content if there's meaningful text
-                if page_text.strip():
-                    att.text += f"## Page {page_num}\n\n{page_text}\n\n"
-                else:
-                    # For pages with no text, add a placeholder
-                    att.text += f"## Page {page_num}\n\n*[No extractable text - likely scanned image]*\n\n"
-        
-        # Detect if this is likely a scanned PDF
-        avg_text_per_page = total_text_length / len(pages_to_process) if pages_to_process else 0
-        is_likely_scanned = (
-            pages_with_text == 0 or  # No pages have text
-            avg_text_per_page < 50 or  # Very little text per page
-            pages_with_text / len(pages_to_process) < 0.3  # Less than 30% of pages have text
-        )
-        
-        if is_likely_scanned:
-            att.text += f"\n📄 **Document Analysis**: This appears to be a scanned PDF with little to no extractable text.\n\n"
-            att.text += f"- **Pages processed**: {len(pages_to_process)}\n"
-            att.text += f"- **Pages with text**: {pages_with_text}\n"
-            att.text += f"- **Average text per page**: {avg_text_per_page:.0f} characters\n\n"
-            att.text += f"💡 **Suggestions**:\n"
-            att.text += f"- Use the extracted images for vision-capable LLMs (Claude, GPT-4V)\n"
-            att.text += f"- Consider OCR tools like `pytesseract` for text extraction\n"
-            att.text += f"- The images are available in the `images` property for multimodal analysis\n\n"
+        for page_num, page_text in _iter_page_texts(att, pdf, valid_pages):
+            if page_text is None:
+                page_text = ""
+            else:
+                pages_extracted += 1
+            
+            # Track text statistics; only add page content if there's meaningful text
+            stripped_length = len(page_text.strip())
+            if stripped_length:
+                pages_with_text += 1
+                total_text_length += stripped_length
+                parts.append(f"## Page {page_num}\n\n{page_text}\n\n")
+            else:
+                # For pages with no text, add a placeholder
+                parts.append(f"## Page {page_num}\n\n*[No extractable text - likely scanned image]*\n\n")
+        
+        analysis = _text_layer_analysis(att, n_to_process, len(valid_pages), pages_extracted,
+                                        pages_with_text, total_text_length)
+        avg_text_per_page = analysis['avg_text_per_page']
+        
+        if analysis['is_likely_scanned']:
+            # Emit the notice once per attachment, even if text and markdown both run
+            if not att.metadata.get('_scanned_notice_emitted'):
+                parts.append(f"\n📄 **Document Analysis**: This appears to be a scanned PDF with little to no extractable text.\n\n")
+                parts.append(f"- **Pages processed**: {n_to_process}\n")
+                parts.append(f"- **Pages with text**: {pages_with_text}\n")
+                parts.append(f"- **Average text per page**: {avg_text_per_page:.0f} characters\n\n")
+                parts.append(f"💡 **Suggestions**:\n")
+                parts.append(f"- Use the extracted images for vision-capable LLMs (Claude, GPT-4V)\n")
+                parts.append(f"- Consider OCR tools like `pytesseract` for text extraction\n")
+                parts.append(f"- The images are available in the `images` property for multimodal analysis\n\n")
+                att.metadata['_scanned_notice_emitted'] = True
             
-            # Add metadata to help downstream processing
-            att.metadata.update({
-                'is_likely_scanned': True,
-                'pages_with_text': pages_with_text,
-                'total_pages': len(pages_to_process),
-                'avg_text_per_page': avg_text_per_page,
-                'text_extraction_quality': 'poor' if avg_text_per_page < 20 else 'limited'
-            })
         else:
-            att.text += f"*Total pages processed: {len(pages_to_process)}*\n\n"
-            att.metadata.update({
-                'is_likely_scanned': False,
-                'pages_with_text': pages_with_text,
-                'total_pages': len(pages_to_process),
-                'avg_text_per_page': avg_text_per_page,
-                'text_extraction_quality': 'good'
-            })
+            parts.append(f"*Total pages processed: {n_to_process}*\n\n")
+        # Add metadata to help downstream processing
+        att.metadata.update(analysis)
             
     except Exception as e:
-        att.text += f"*Error extracting PDF text: {e}*\n\n"
+        parts.append(f"*Error extracting PDF text: {e}*\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
+
+def _page_text_cache(att: Attachment, pdf: 'pdfplumber.PDF') -> dict:
+    """
+    Per-attachment {page_num: text} cache for a pdfplumber document.
+    
+    markdown(pdf) and text(pdf) often run on the same attachment; the cache
+    lets the second one reuse pdfplumber's work. It is tied to the PDF
+    object so a re-loaded document never sees stale text, and kept on a
+    private attribute so metadata stays plain, serializable data.
+    """
+    cache = att._page_text_cache
+    if cache is None or cache['obj'] is not pdf:
+        cache = {'obj': pdf, 'pages': {}}
+        att._page_text_cache = cache
+    return cache['pages']
+
+
+def _get_page_text(att: Attachment, pdf: 'pdfplumber.PDF', page_num: int) -> str:
+    """Extract text for a 1-based page, memoized on the attachment."""
+    page_texts = _page_text_cache(att, pdf)
+    if page_num not in page_texts:
+        page_texts[page_num] = pdf.pages[page_num - 1].extract_text() or ""
+    return page_texts[page_num]
+
+
+def _text_layer_analysis(att: Attachment, n_to_process: int, n_valid: int, pages_extracted: int,
+                         pages_with_text: int, total_text_length: int) -> dict:
+    """
+    Scanned-PDF heuristics shared by markdown(pdf) and text(pdf).
+    
+    After an early exit only the probed pages count toward the average.
+    Returns the metadata both presenters record.
+    """
+    scanned_early_exit = pages_extracted < n_valid
+    if scanned_early_exit:
+        att.metadata['scanned_early_exit'] = True
+    denominator = pages_extracted if scanned_early_exit else n_to_process
+    avg_text_per_page = total_text_length / denominator if denominator else 0
+    is_likely_scanned = (
+        pages_with_text == 0 or  # No pages have text
+        avg_text_per_page < 50 or  # Very little text per page
+        pages_with_text / n_to_process < 0.3  # Less than 30% of pages have text
+    )
+    if not is_likely_scanned:
+        quality = 'good'
+    else:
+        quality = 'poor' if avg_text_per_page < 20 else 'limited'
+    return {
+        'is_likely_scanned': is_likely_scanned,
+        'pages_with_text': pages_with_text,
+        'total_pages': n_to_process,
+        'avg_text_per_page': avg_text_per_page,
+        'text_extraction_quality': quality
+    }
+
+
+# Pages probed before a text-less PDF is treated as scanned and extraction stops
+_SCANNED_PROBE_PAGES = 10
+
+
+def _iter_page_texts(att: Attachment, pdf: 'pdfplumber.PDF', page_nums: list):
+    """
+    Yield (page_num, text) for valid 1-based pages, extracting through the cache.
+    
+    If none of the first _SCANNED_PROBE_PAGES pages has text, the document is
+    treated as scanned and the remaining pages yield None without calling
+    extract_text(). Otherwise the rest is prefetched before it is consumed.
+    With [text_engine:pdfium] pages are read through pdfium's text layer
+    instead, the probe pages first and the rest only if the probe finds
+    text, falling back to pdfplumber for any pdfium cannot read.
+    """
+    use_pdfium = att.commands.get('text_engine', '').lower() == 'pdfium'
+    if use_pdfium:
+        _pdfium_fill_page_texts(att, pdf, page_nums[:_SCANNED_PROBE_PAGES])
+    for i, page_num in enumerate(page_nums):
+        if i == _SCANNED_PROBE_PAGES:
+            if not any(_get_page_text(att, pdf, probed).strip() for probed in page_nums[:i]):
+                for skipped in page_nums[i:]:
+                    yield skipped, None
+                return
+            if use_pdfium:
+                _pdfium_fill_page_texts(att, pdf, page_nums[i:])
+            _prefetch_page_texts(att, pdf, page_nums[i:])
+        yield page_num, _get_page_text(att, pdf, page_num)
+
+
+def _pdfium_fill_page_texts(att: Attachment, pdf: 'pdfplumber.PDF', page_nums) -> None:
+    """
+    Fill the page text cache from pdfium's text layer.
+    
+    Much cheaper than pdfplumber's per-character layout analysis, but with
+    pdfium's reading order. Uses the pdfium document shared with the image
+    and OCR presenters; any failure leaves the pages to pdfplumber.
+    """
+    if _pdfium is None:
+        return
+    page_texts = _page_text_cache(att, pdf)
+    missing = [page_num for page_num in page_nums if page_num not in page_texts]
+    if not missing:
+        return
+    try:
+        pdf_doc, _ = _pdfium_document(att, pdf)
+        with _PDFIUM_LOCK:
+            for page_num in missing:
+                # pdfium separates lines with CRLF
+                page_texts[page_num] = _pdfium_page_text(pdf_doc, page_num - 1).replace('\r\n', '\n')
+    except Exception:
+        pass
+
+
+# Below this many uncached pages, opening extra pdfplumber handles costs more than it saves
+_PARALLEL_MIN_PAGES = 16
+
+
+def _prefetch_page_texts(att: Attachment, pdf: 'pdfplumber.PDF', page_nums) -> None:
+    """
+    Fill the page text cache using worker threads.
+    
+    pdfplumber documents are not thread-safe, so each worker opens its own
+    handle on the file and extracts an interleaved share of the pages.
+    Disabled with [parallel:false]; any failure leaves the remaining pages
+    to the sequential path.
+    """
+    if att.commands.get('parallel', 'true').lower() == 'false':
+        return
+    
+    pdf_path = att.metadata.get('temp_pdf_path') or att.path
+    page_texts = _page_text_cache(att, pdf)
+    missing = [page_num for page_num in page_nums if page_num not in page_texts]
+    if len(missing) < _PARALLEL_MIN_PAGES or not pdf_path or not os.path.isfile(pdf_path):
+        return
+    
+    try:
+        import pdfplumber
+        from concurrent.futures import ThreadPoolExecutor
+        
+        workers = min(8, os.cpu_count() or 4)
+        chunks = [missing[i::workers] for i in range(workers)]
+        
+        def extract(chunk):
+            with pdfplumber.open(pdf_path) as worker_pdf:
+                return [(page_num, worker_pdf.pages[page_num - 1].extract_text() or "")
+                        for page_num in chunk]
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for rows in executor.map(extract, chunks):
+                page_texts.update(rows)
+    except Exception:
+        pass
+
+
+def _slide_texts(att: Attachment, pres: 'pptx.Presentation', slide_idx: int, slide) -> list:
+    """
+    Non-blank shape texts of a slide, memoized on the attachment.
+    
+    markdown(pres) and text(pres) often run on the same attachment; like the
+    PDF page text cache, this walks each slide's shapes once, is tied to
+    the presentation object and lives on a private attribute, not metadata.
+    """
+    cache = att._slide_text_cache
+    if cache is None or cache['obj'] is not pres:
+        cache = {'obj': pres, 'slides': {}}
+        att._slide_text_cache = cache
+    slides = cache['slides']
+    if slide_idx not in slides:
+        # has_text_frame is a plain flag; hasattr() pays for a failed lookup on pictures/tables
+        texts = [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+        slides[slide_idx] = [t for t in texts if t.strip()]
+    return slides[slide_idx]
+
+
 @presenter
 def markdown(att: Attachment, pres: 'pptx.Presentation') -> Attachment:
     """Convert PowerPoint to markdown with slide content."""
-    att.text += f"# Presentation: {att.path}\n\n"
+    parts = [f"# Presentation: {att.path}\n\n"]
     
     try:
-        slide_indices = att.metadata.get('selected_slides', range(min(5, len(pres.slides))))
-        
-        for i, slide_idx in enumerate(slide_indices):
-            if 0 <= slide_idx < len(pres.slides):
-                slide = pres.slides[slide_idx]
-                att.text += f"## Slide {slide_idx + 1}\n\n"
+        slides = pres.slides
+        n_slides = len(slides)
+        selected = att.metadata.get('selected_slides')
+        slide_indices = tuple(selected if selected is not None else range(min(5, n_slides)))
+        
+        for slide_idx in slide_indices:
+            if 0 <= slide_idx < n_slides:
+                slide = slides[slide_idx]
+                parts.append(f"## Slide {slide_idx + 1}\n\n")
                 
-                for shape in slide.shapes:
-                    if hasattr(shape, 'text') and shape.text.strip():
-                        att.text += f"{shape.text}\n\n"
+                texts = _slide_texts(att, pres, slide_idx, slide)
+                if texts:
+                    parts.append("\n\n".join(texts) + "\n\n")
         
-        att.text += f"*Slides processed: {len(slide_indices)}*\n\n"
+        parts.append(f"*Slides processed: {len(slide_indices)}*\n\n")
     except Exception as e:
-        att.text += f"*Error extracting slides: {e}*\n\n"
+        parts.append(f"*Error extracting slides: {e}*\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
 @presenter
 def markdown(att: Attachment, img: 'PIL.Image.Image') -> Attachment:
     """Convert image to markdown with metadata."""
-    att.text += f"# Image: {att.path}\n\n"
+    parts = [f"# Image: {att.path}\n\n"]
     try:
-        att.text += f"- **Format**: {getattr(img, 'format', 'Unknown')}\n"
-        att.text += f"- **Size**: {getattr(img, 'size', 'Unknown')}\n"
-        att.text += f"- **Mode**: {getattr(img, 'mode', 'Unknown')}\n\n"
-        att.text += "*Image converted to base64 and available in images list*\n\n"
+        parts.append(f"- **Format**: {getattr(img, 'format', 'Unknown')}\n")
+        parts.append(f"- **Size**: {getattr(img, 'size', 'Unknown')}\n")
+        parts.append(f"- **Mode**: {getattr(img, 'mode', 'Unknown')}\n\n")
+        parts.append("*Image converted to base64 and available in images list*\n\n")
     except:
-        att.text += "*Image metadata not available*\n\n"
+        parts.append("*Image metadata not available*\n\n")
+    att.text += "".join(parts)
     return att
 
 
 # TEXT PRESENTERS
 @presenter
 def text(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
-    """Convert pandas DataFrame to plain text."""
+    """
+    Convert pandas DataFrame to plain text.
+    
+    Like markdown(df), only the first [max_rows:N] rows (default 1000) are
+    written, followed by a truncation note. [full_table:true] writes every
+    row; above 10,000 rows it is written tab-separated.
+    """
     try:
-        att.text += f"Data from {att.path}\n"
-        att.text += "=" * len(f"Data from {att.path}") + "\n\n"
-        att.text += df.to_string(index=False)
-        att.text += f"\n\nShape: {df.shape}\n\n"
+        header = f"Data from {att.path}"
+        max_rows = _df_max_rows(att)
+        truncated = False
+        if att.commands.get('full_table', 'false').lower() == 'true':
+            if len(df) > _LARGE_FRAME_ROWS:
+                # to_csv's C writer instead of to_string's per-column width padding
+                body = df.to_csv(sep='\t', index=False)
+            else:
+                body = _df_rendered(att, df, ('string',), lambda: df.to_string(index=False))
+        elif len(df) > max_rows:
+            truncated = True
+            body = _df_rendered(att, df, ('string', max_rows),
+                                lambda: df.head(max_rows).to_string(index=False))
+        else:
+            body = _df_rendered(att, df, ('string',), lambda: df.to_string(index=False))
+        att.append_text("".join([
+            header, "\n",
+            "=" * len(header), "\n\n",
+            body,
+            f"\n\nTruncated to {max_rows} of {len(df)} rows" if truncated else "",
+            f"\n\nShape: {df.shape}\n\n",
+        ]))
     except:
         att.text += f"Data from {att.path}\n*Could not convert to text*\n\n"
     return att
@@ -147,78 +438,65 @@ def text(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
 @presenter
 def text(att: Attachment, pdf: 'pdfplumber.PDF') -> Attachment:
     """Extract plain text from PDF. Handles scanned PDFs gracefully."""
-    att.text += f"PDF Document: {att.path}\n"
-    att.text += "=" * len(f"PDF Document: {att.path}") + "\n\n"
+    header = f"PDF Document: {att.path}"
+    parts = [header, "\n", "=" * len(header), "\n\n"]
     
     try:
+        pages = pdf.pages
+        n_pages = len(pages)
+        
         # Process ALL pages by default, or only selected pages if specified
-        if 'selected_pages' in att.metadata:
-            pages_to_process = att.metadata['selected_pages']
-        else:
-            # Process ALL pages by default
-            pages_to_process = range(1, len(pdf.pages) + 1)
+        selected = att.metadata.get('selected_pages')
+        pages_to_process = selected if selected is not None else range(1, n_pages + 1)
+        n_to_process = len(pages_to_process)
+        
+        valid_pages = [page_num for page_num in pages_to_process if 1 <= page_num <= n_pages]
         
         total_text_length = 0
         pages_with_text = 0
+        pages_extracted = 0
         
-        for page_num in pages_to_process:
-            if 1 <= page_num <= len(pdf.pages):
-                page = pdf.pages[page_num - 1]
-                page_text = page.extract_text() or ""
-                
-                # Track text statistics
-                if page_text.strip():
-                    pages_with_text += 1
-                    total_text_length += len(page_text.strip())
-                
-                # Only add page content if there's meaningful text
-                if page_text.strip():
-                    att.text += f"[Page {page_num}]\n{page_text}\n\n"
-                else:
-                    # For pages with no text, add a placeholder
-                    att.text += f"[Page {page_num}]\n[No extractable text - likely scanned image]\n\n"
-        
-        # Detect if this is likely a scanned PDF (same logic as markdown presenter)
-        avg_text_per_page = total_text_length / len(pages_to_process) if pages_to_process else 0
-        is_likely_scanned = (
-            pages_with_text == 0 or  # No pages have text
-            avg_text_per_page < 50 or  # Very little text per page
-            pages_with_text / len(pages_to_process) < 0.3  # Less than 30% of pages have text
-        )
-        
-        if is_likely_scanned:
-            att.text += f"\nDOCUMENT ANALYSIS: This appears to be a scanned PDF with little to no extractable text.\n\n"
-            att.text += f"- Pages processed: {len(pages_to_process)}\n"
-            att.text += f"- Pages with text: {pages_with_text}\n"
-            att.text += f"- Average text per page: {avg_text_per_page:.0f} characters\n\n"
-            att.text += f"SUGGESTIONS:\n"
-            att.text += f"- Use the extracted images for vision-capable LLMs (Claude, GPT-4V)\n"
-            att.text += f"- Consider OCR tools like pytesseract for text extraction\n"
-            att.text += f"- The images are available in the images property for multimodal analysis\n\n"
+        for page_num, page_text in _iter_page_texts(att, pdf, valid_pages):
+            if page_text is None:
+                page_text = ""
+            else:
+                pages_extracted += 1
             
-            # Add metadata to help downstream processing (if not already added by markdown presenter)
-            if 'is_likely_scanned' not in att.metadata:
-                att.metadata.update({
-                    'is_likely_scanned': True,
-                    'pages_with_text': pages_with_text,
-                    'total_pages': len(pages_to_process),
-                    'avg_text_per_page': avg_text_per_page,
-                    'text_extraction_quality': 'poor' if avg_text_per_page < 20 else 'limited'
-                })
-        else:
-            # Add metadata for good text extraction (if not already added)
-            if 'is_likely_scanned' not in att.metadata:
-                att.metadata.update({
-                    'is_likely_scanned': False,
-                    'pages_with_text': pages_with_text,
-                    'total_pages': len(pages_to_process),
-                    'avg_text_per_page': avg_text_per_page,
-                    'text_extraction_quality': 'good'
-                })
+            # Track text statistics; only add page content if there's meaningful text
+            stripped_length = len(page_text.strip())
+            if stripped_length:
+                pages_with_text += 1
+                total_text_length += stripped_length
+                parts.append(f"[Page {page_num}]\n{page_text}\n\n")
+            else:
+                # For pages with no text, add a placeholder
+                parts.append(f"[Page {page_num}]\n[No extractable text - likely scanned image]\n\n")
+        
+        analysis = _text_layer_analysis(att, n_to_process, len(valid_pages), pages_extracted,
+                                        pages_with_text, total_text_length)
+        avg_text_per_page = analysis['avg_text_per_page']
+        
+        if analysis['is_likely_scanned']:
+            # Skip the notice if the markdown presenter already emitted it
+            if not att.metadata.get('_scanned_notice_emitted'):
+                parts.append(f"\nDOCUMENT ANALYSIS: This appears to be a scanned PDF with little to no extractable text.\n\n")
+                parts.append(f"- Pages processed: {n_to_process}\n")
+                parts.append(f"- Pages with text: {pages_with_text}\n")
+                parts.append(f"- Average text per page: {avg_text_per_page:.0f} characters\n\n")
+                parts.append(f"SUGGESTIONS:\n")
+                parts.append(f"- Use the extracted images for vision-capable LLMs (Claude, GPT-4V)\n")
+                parts.append(f"- Consider OCR tools like pytesseract for text extraction\n")
+                parts.append(f"- The images are available in the images property for multimodal analysis\n\n")
+                att.metadata['_scanned_notice_emitted'] = True
+            
+        # Add metadata to help downstream processing (if not already added by markdown presenter)
+        if 'is_likely_scanned' not in att.metadata:
+            att.metadata.update(analysis)
                 
     except:
-        att.text += "*Error extracting PDF text*\n\n"
+        parts.append("*Error extracting PDF text*\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
@@ -238,16 +516,20 @@ def html(att: Attachment, soup: 'bs4.BeautifulSoup') -> Attachment:
 
 
 # IMAGES PRESENTERS
+# Image modes the PNG encoder writes without conversion
+_PNG_NATIVE_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA', 'I', 'I;16', 'I;16B')
+
+
 @presenter
 def images(att: Attachment, img: 'PIL.Image.Image') -> Attachment:
     """Convert PIL Image to base64."""
     try:
         buffer = io.BytesIO()
-        # Convert to RGB if necessary
-        if hasattr(img, 'mode') and img.mode in ('RGBA', 'P'):
+        # PNG stores these modes natively; only convert the ones it cannot (CMYK, LAB, ...)
+        if hasattr(img, 'mode') and img.mode not in _PNG_NATIVE_MODES:
             img = img.convert('RGB')
-        img.save(buffer, format='PNG')
-        att.images.append(base64.b64encode(buffer.getvalue()).decode())
+        img.save(buffer, format='PNG', compress_level=1)
+        att.images.append(_buffer_b64(buffer).decode('ascii'))
     except Exception as e:
         print(f"Error converting image to base64: {e}")
     return att
@@ -256,118 +538,48 @@ def images(att: Attachment, img: 'PIL.Image.Image') -> Attachment:
 @presenter
 def images(att: Attachment, pres: 'pptx.Presentation') -> Attachment:
     """Convert PPTX slides to PNG images by converting to PDF first, then rendering."""
-    try:
-        # Try to import required libraries
-        import pypdfium2 as pdfium
-        import subprocess
-        import shutil
-        import tempfile
-        import os
-        from pathlib import Path
-        import base64
-        import io
-    except ImportError as e:
-        att.metadata['pptx_images_error'] = f"Required libraries not installed: {e}. Install with: pip install pypdfium2"
+    if _pdfium is None:
+        att.metadata['pptx_images_error'] = "pypdfium2 not installed. Install with: pip install pypdfium2"
         return att
     
-    # Get resize parameter from DSL commands
+    # Get resize and encoding parameters from DSL commands
     resize = att.commands.get('resize_images')
+    image_format = att.commands.get('image_format', 'png')
+    image_quality = int(att.commands.get('image_quality', 85))
     
     images = []
     
     try:
-        # Convert PPTX to PDF first (using LibreOffice/soffice like your office_contact_sheet.py)
-        def convert_pptx_to_pdf(pptx_path: str) -> str:
-            """Convert PPTX to PDF using LibreOffice/soffice."""
-            # Try to find LibreOffice or soffice
-            soffice = shutil.which("libreoffice") or shutil.which("soffice")
-            if not soffice:
-                raise RuntimeError("LibreOffice/soffice not found. Install LibreOffice to convert PPTX to PDF.")
-            
-            # Create temporary directory for PDF output
-            temp_dir = tempfile.mkdtemp()
-            pptx_path_obj = Path(pptx_path)
-            
-            # Run LibreOffice conversion
-            subprocess.run(
-                [soffice, "--headless", "--convert-to", "pdf", "--outdir", temp_dir, str(pptx_path_obj)],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=60  # 60 second timeout
-            )
-            
-            # Find the generated PDF
-            pdf_path = Path(temp_dir) / (pptx_path_obj.stem + ".pdf")
-            if not pdf_path.exists():
-                raise RuntimeError(f"PDF conversion failed - output file not found: {pdf_path}")
-            
-            return str(pdf_path)
-        
         # Convert PPTX to PDF
         if not att.path:
             raise RuntimeError("No file path available for PPTX conversion")
         
-        pdf_path = convert_pptx_to_pdf(att.path)
+        # Cached by content hash, so re-presenting the same file skips LibreOffice
+        pdf_path = _cached_soffice_convert(att.path, 'pptx2pdf')
         
-        try:
-            # Open the PDF with pypdfium2
-            pdf_doc = pdfium.PdfDocument(pdf_path)
+        # Open the PDF with pypdfium2
+        with _PDFIUM_LOCK:
+            pdf_doc = _pdfium.PdfDocument(pdf_path)
             num_pages = len(pdf_doc)
-            
+        
+        try:
             # Get selected slides (respects pages DSL command)
-            slide_indices = att.metadata.get('selected_slides', range(num_pages))
-            
-            # Convert slide indices to page indices (slides are 1-based, pages are 0-based)
-            if isinstance(slide_indices, range):
-                page_indices = list(slide_indices)
-            else:
-                # Convert 1-based slide numbers to 0-based page indices
-                page_indices = [idx if isinstance(slide_indices, range) else idx for idx in slide_indices]
+            # selected_slides is already 0-based, so slide indices are page indices
+            selected = att.metadata.get('selected_slides')
+            page_indices = tuple(selected if selected is not None else range(num_pages))
             
             # Limit to reasonable number of slides
             max_slides = min(num_pages, 20)
             page_indices = page_indices[:max_slides]
             
-            for page_idx in page_indices:
-                if 0 <= page_idx < num_pages:
-                    page = pdf_doc[page_idx]
-                    
-                    # Render at 2x scale for better quality (like PDF processor)
-                    pil_image = page.render(scale=2).to_pil()
-                    
-                    # Apply resize if specified
-                    if resize:
-                        if 'x' in resize:
-                            # Format: 800x600
-                            w, h = map(int, resize.split('x'))
-                            pil_image = pil_image.resize((w, h), pil_image.Resampling.LANCZOS)
-                        elif resize.endswith('%'):
-                            # Format: 50%
-                            scale = int(resize[:-1]) / 100
-                            new_width = int(pil_image.width * scale)
-                            new_height = int(pil_image.height * scale)
-                            pil_image = pil_image.resize((new_width, new_height), pil_image.Resampling.LANCZOS)
-                    
-                    # Convert to PNG bytes
-                    img_byte_arr = io.BytesIO()
-                    pil_image.save(img_byte_arr, format='PNG')
-                    png_bytes = img_byte_arr.getvalue()
-                    
-                    # Encode as base64 data URL (consistent with PDF processor)
-                    b64_string = base64.b64encode(png_bytes).decode('utf-8')
-                    images.append(f"data:image/png;base64,{b64_string}")
-            
-            # Clean up PDF document
-            pdf_doc.close()
+            page_indices = [page_idx for page_idx in page_indices if 0 <= page_idx < num_pages]
+            images = _render_pdf_images(pdf_doc, page_indices, resize,
+                                        image_format=image_format, quality=image_quality)
             
         finally:
-            # Clean up temporary PDF file
-            try:
-                os.unlink(pdf_path)
-                os.rmdir(os.path.dirname(pdf_path))
-            except:
-                pass  # Ignore cleanup errors
+            # Clean up PDF document (the converted PDF itself stays in the cache)
+            with _PDFIUM_LOCK:
+                pdf_doc.close()
         
         # Add images to attachment
         att.images.extend(images)
@@ -394,56 +606,393 @@ def images(att: Attachment, pres: 'pptx.Presentation') -> Attachment:
         return att
 
 
+def _cache_dir(kind: str) -> 'Path':
+    """Cache directory for derived files: $XDG_CACHE_HOME/attachments/<kind> (temp dir fallback)."""
+    base = os.environ.get('XDG_CACHE_HOME') or str(Path.home() / '.cache')
+    for root in (Path(base), Path(tempfile.gettempdir())):
+        cache_dir = root / 'attachments' / kind
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            return cache_dir
+        except OSError:
+            continue
+    raise RuntimeError(f"No writable cache directory for {kind}")
+
+
+def _content_hash(source) -> str:
+    """blake2b hex digest of a file's content (given its path) or of bytes."""
+    import hashlib
+    
+    hasher = hashlib.blake2b(digest_size=16)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        hasher.update(source)
+    else:
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# Size cap per cache directory in MB ($ATTACHMENTS_CACHE_MAX_MB); least recently used files go first
+_CACHE_MAX_MB_DEFAULT = 512
+
+
+def _prune_cache(kind: str) -> None:
+    """Evict the least recently used files in a cache directory until it is under the size cap."""
+    try:
+        limit = float(os.environ.get('ATTACHMENTS_CACHE_MAX_MB', _CACHE_MAX_MB_DEFAULT)) * 1024 * 1024
+    except ValueError:
+        limit = _CACHE_MAX_MB_DEFAULT * 1024 * 1024
+    try:
+        entries = []
+        total = 0
+        with os.scandir(_cache_dir(kind)) as it:
+            for entry in it:
+                # Dot files are in-flight staging files
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= limit:
+            return
+        # Hits refresh mtime, so oldest mtime is least recently used
+        entries.sort()
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+    except (OSError, RuntimeError):
+        pass
+
+
+def _page_cache_enabled(att: Attachment) -> bool:
+    """
+    Whether rendered pages and OCR text go to the on-disk page cache.
+    
+    Opt-in, since the cache keeps document contents on disk: [cache:true],
+    or $ATTACHMENTS_DISK_CACHE=1 with [cache:false] still opting out.
+    """
+    setting = att.commands.get('cache')
+    if setting is not None:
+        return setting.lower() == 'true'
+    return os.environ.get('ATTACHMENTS_DISK_CACHE', '').lower() in ('1', 'true', 'yes')
+
+
+def _office_pdf_cache_path(src: 'Path', kind: str) -> 'Path':
+    """Cache location of the PDF for src, keyed by a hash of its content."""
+    return _cache_dir(kind) / f"{_content_hash(src)}.pdf"
+
+
+def _pdf_content_hash(att: Attachment, pdf_source) -> str:
+    """Content hash of the PDF behind att, computed once per attachment."""
+    digest = att.metadata.get('pdf_content_hash')
+    if digest is None:
+        digest = att.metadata['pdf_content_hash'] = _content_hash(pdf_source)
+    return digest
+
+
+def _page_cache_read(name: str):
+    """Cached rendered-page or OCR text stored under name, or None on a miss."""
+    try:
+        path = _cache_dir('pdf-pages') / name
+        text = path.read_text(encoding='utf-8')
+        os.utime(path)  # mark as recently used for _prune_cache
+        return text
+    except (OSError, RuntimeError, UnicodeDecodeError):
+        return None
+
+
+def _page_cache_write(name: str, text: str) -> None:
+    """Store text under name atomically; a failed write only costs the cache entry."""
+    try:
+        path = _cache_dir('pdf-pages') / name
+        staging = path.parent / f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        staging.write_text(text, encoding='utf-8')
+        os.replace(staging, path)
+    except (OSError, RuntimeError):
+        pass
+
+
+def _publish_cached_pdf(pdf_path: 'Path', cached_pdf: 'Path') -> None:
+    """Move a freshly converted PDF into the cache atomically, so readers never see a partial file."""
+    staging = cached_pdf.parent / f".{cached_pdf.stem}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.move(str(pdf_path), str(staging))
+    os.replace(staging, cached_pdf)
+
+
+# Persistent headless LibreOffice driven over UNO, started on the first cache miss.
+# UNO calls into one office instance are serialized under _SOFFICE_LOCK.
+_SOFFICE_LOCK = threading.Lock()
+_SOFFICE_SERVER = {}
+
+# Seconds one document may take to convert, on the server or in a one-shot run
+_SOFFICE_TIMEOUT = 60
+
+_PDF_EXPORT_FILTERS = {
+    'pptx2pdf': 'impress_pdf_Export',
+    'docx2pdf': 'writer_pdf_Export',
+    'xlsx2pdf': 'calc_pdf_Export',
+}
+
+
+def _stop_soffice_server(proc, profile_dir):
+    """Terminate the persistent soffice process and drop its private profile."""
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def _soffice_desktop(soffice: str):
+    """
+    Return the UNO Desktop of the persistent soffice, starting it on first use.
+    
+    Returns None when the python-uno bridge is not importable or the
+    server does not come up. Call with _SOFFICE_LOCK held.
+    """
+    if 'desktop' in _SOFFICE_SERVER:
+        if _SOFFICE_SERVER['proc'].poll() is None:
+            return _SOFFICE_SERVER['desktop']
+        # Died (or was killed by the conversion watchdog) since the last call
+        _stop_soffice_server(_SOFFICE_SERVER['proc'], _SOFFICE_SERVER['profile_dir'])
+        _SOFFICE_SERVER.clear()
+    if _SOFFICE_SERVER.get('unavailable'):
+        return None
+    try:
+        import uno
+    except ImportError:
+        _SOFFICE_SERVER['unavailable'] = True
+        return None
+    import time
+    import atexit
+    
+    # A private profile and a per-process pipe keep this instance apart from
+    # a desktop LibreOffice session and from other Python processes
+    profile_dir = tempfile.mkdtemp(prefix='attachments-soffice-')
+    accept = f"pipe,name=attachments-soffice-{os.getpid()};urp;StarOffice.ComponentContext"
+    proc = subprocess.Popen(
+        [soffice, "--headless", "--invisible", "--nologo", "--norestore", "--nodefault",
+         f"-env:UserInstallation={Path(profile_dir).as_uri()}", f"--accept={accept}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    atexit.register(_stop_soffice_server, proc, profile_dir)
+    
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_ctx)
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            ctx = resolver.resolve(f"uno:{accept}")
+            break
+        except Exception:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                _stop_soffice_server(proc, profile_dir)
+                _SOFFICE_SERVER['unavailable'] = True
+                return None
+            time.sleep(0.25)
+    
+    desktop = ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+    _SOFFICE_SERVER.update(proc=proc, profile_dir=profile_dir, desktop=desktop)
+    return desktop
+
+
+def _convert_with_soffice_server(soffice: str, src: Path, pdf_path: Path, kind: str) -> bool:
+    """
+    Export src to pdf_path through the persistent soffice.
+    
+    Returns False when the server can't be used, so the caller falls back
+    to a one-shot soffice run. A document that takes longer than
+    _SOFFICE_TIMEOUT gets the server killed, which unblocks the UNO call
+    and releases _SOFFICE_LOCK; the next miss starts a fresh server.
+    """
+    with _SOFFICE_LOCK:
+        desktop = _soffice_desktop(soffice)
+        if desktop is None:
+            return False
+        from com.sun.star.beans import PropertyValue
+        
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name, p.Value = name, value
+            return p
+        
+        proc = _SOFFICE_SERVER['proc']
+        watchdog = threading.Timer(_SOFFICE_TIMEOUT, proc.kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            doc = desktop.loadComponentFromURL(
+                src.resolve().as_uri(), "_blank", 0, (prop("Hidden", True), prop("ReadOnly", True)))
+            if doc is None:
+                return False
+            try:
+                doc.storeToURL(pdf_path.as_uri(), (prop("FilterName", _PDF_EXPORT_FILTERS[kind]),))
+            finally:
+                doc.close(True)
+        except Exception:
+            # If the office process died (or the watchdog killed it), forget it
+            # so the next miss starts a fresh one
+            if proc.poll() is not None:
+                _stop_soffice_server(proc, _SOFFICE_SERVER['profile_dir'])
+                _SOFFICE_SERVER.clear()
+            return False
+        finally:
+            watchdog.cancel()
+        return True
+
+
+def _soffice_server_available() -> bool:
+    """Whether conversions can go through the persistent soffice (python-uno importable)."""
+    if 'desktop' in _SOFFICE_SERVER:
+        return True
+    if _SOFFICE_SERVER.get('unavailable'):
+        return False
+    import importlib.util
+    return importlib.util.find_spec('uno') is not None
+
+
+def _cached_soffice_convert(src_path: str, kind: str) -> str:
+    """
+    Convert an Office file to PDF with LibreOffice, caching the PDF by content hash.
+    
+    A hit returns the cached PDF without starting soffice, which costs
+    several seconds per call. The returned file belongs to the cache;
+    callers must not delete it. The cache lives under
+    $XDG_CACHE_HOME/attachments/<kind> (~/.cache by default) and is capped
+    at $ATTACHMENTS_CACHE_MAX_MB (512 MB), evicting least recently used PDFs.
+    """
+    src = Path(src_path)
+    cached_pdf = _office_pdf_cache_path(src, kind)
+    if cached_pdf.exists():
+        try:
+            os.utime(cached_pdf)  # mark as recently used for _prune_cache
+        except OSError:
+            pass
+        return str(cached_pdf)
+    
+    # Try to find LibreOffice or soffice
+    soffice = shutil.which("libreoffice") or shutil.which("soffice")
+    if not soffice:
+        label = src.suffix.lstrip('.').upper() or 'document'
+        raise RuntimeError(f"LibreOffice/soffice not found. Install LibreOffice to convert {label} to PDF.")
+    
+    # The output directory goes away with anything soffice left behind (lock files etc.)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / (src.stem + ".pdf")
+        if not _convert_with_soffice_server(soffice, src, pdf_path, kind):
+            # One-shot conversion: pays the full LibreOffice startup per file
+            subprocess.run(
+                [soffice, "--headless", "--convert-to", "pdf", "--outdir", temp_dir, str(src)],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=_SOFFICE_TIMEOUT
+            )
+        
+        if not pdf_path.exists():
+            raise RuntimeError(f"PDF conversion failed - output file not found: {pdf_path}")
+        
+        _publish_cached_pdf(pdf_path, cached_pdf)
+    
+    _prune_cache(kind)
+    return str(cached_pdf)
+
+
+# Office formats whose images presenters render through the soffice PDF cache
+_OFFICE_PDF_KINDS = {'.pptx': 'pptx2pdf', '.docx': 'docx2pdf', '.xlsx': 'xlsx2pdf'}
+
+
+def _prewarm_office_pdf_cache(paths) -> None:
+    """
+    Convert several uncached Office files with one soffice invocation per kind.
+    
+    LibreOffice accepts many inputs per --convert-to call, so a batch pays
+    its multi-second startup once instead of once per file. Results land in
+    the same cache _cached_soffice_convert() reads. Best-effort: anything
+    not converted here is converted individually by the presenter later.
+    Skipped when the persistent soffice server can be used, since it already
+    pays the startup once for every conversion.
+    """
+    soffice = shutil.which("libreoffice") or shutil.which("soffice")
+    if not soffice or _soffice_server_available():
+        return
+    
+    batches = {}
+    for path in paths:
+        src = Path(path)
+        kind = _OFFICE_PDF_KINDS.get(src.suffix.lower())
+        if kind is None or not src.is_file():
+            continue
+        try:
+            cached_pdf = _office_pdf_cache_path(src, kind)
+        except (OSError, RuntimeError):
+            continue
+        if cached_pdf.exists():
+            continue
+        # soffice names outputs by stem, so same-named inputs can't share a batch
+        batch = batches.setdefault(kind, {})
+        batch.setdefault(src.stem, (src, cached_pdf))
+    
+    for kind, batch in batches.items():
+        if len(batch) < 2:
+            continue
+        temp_dir = tempfile.mkdtemp()
+        try:
+            subprocess.run(
+                [soffice, "--headless", "--convert-to", "pdf", "--outdir", temp_dir,
+                 *(str(src) for src, _ in batch.values())],
+                check=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=_SOFFICE_TIMEOUT * len(batch)
+            )
+            for stem, (src, cached_pdf) in batch.items():
+                pdf_path = Path(temp_dir) / (stem + ".pdf")
+                if pdf_path.exists():
+                    _publish_cached_pdf(pdf_path, cached_pdf)
+        except (subprocess.SubprocessError, OSError):
+            pass
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 @presenter
 def images(att: Attachment, pdf_reader: 'pdfplumber.PDF') -> Attachment:
     """
     Convert PDF pages to PNG images using pypdfium2 (MIT-compatible).
     
     Extracts resize parameter from DSL commands: file.pdf[resize:50%]
+    JPEG output is opt-in: file.pdf[image_format:jpeg][image_quality:80];
+    the encoding used is recorded in metadata['pdf_image_format'].
+    With file.pdf[cache:true] (or $ATTACHMENTS_DISK_CACHE=1) rendered pages
+    are kept in the size-capped on-disk page cache and reused.
     """
-    try:
-        # Try to import pypdfium2
-        import pypdfium2 as pdfium
-    except ImportError:
-        # Fallback: add error message to metadata
+    if _pdfium is None:
         att.metadata['pdf_images_error'] = "pypdfium2 not installed. Install with: pip install pypdfium2"
         return att
     
-    # Get resize parameter from DSL commands
+    # Get resize and encoding parameters from DSL commands
     resize = att.commands.get('resize')
+    image_format = att.commands.get('image_format', 'png')
+    image_quality = int(att.commands.get('image_quality', 85))
     
     images = []
     
     try:
-        # Get the PDF bytes for pypdfium2
-        # Check if we have a temporary PDF path (with CropBox already fixed)
-        if 'temp_pdf_path' in att.metadata:
-            # Use the temporary PDF file that already has CropBox defined
-            with open(att.metadata['temp_pdf_path'], 'rb') as f:
-                pdf_bytes = f.read()
-        elif hasattr(pdf_reader, 'stream') and pdf_reader.stream:
-            # Save current position
-            original_pos = pdf_reader.stream.tell()
-            # Read the PDF bytes
-            pdf_reader.stream.seek(0)
-            pdf_bytes = pdf_reader.stream.read()
-            # Restore position
-            pdf_reader.stream.seek(original_pos)
-        else:
-            # Try to get bytes from the file path if available
-            if hasattr(pdf_reader, 'stream') and hasattr(pdf_reader.stream, 'name'):
-                with open(pdf_reader.stream.name, 'rb') as f:
-                    pdf_bytes = f.read()
-            elif att.path:
-                # Use the attachment path directly
-                with open(att.path, 'rb') as f:
-                    pdf_bytes = f.read()
-            else:
-                raise Exception("Cannot access PDF bytes for rendering")
-        
-        # Open with pypdfium2 (CropBox should already be defined if temp file was used)
-        pdf_doc = pdfium.PdfDocument(pdf_bytes)
-        num_pages = len(pdf_doc)
+        # Shared with ocr(); CropBox should already be defined if temp file was used
+        pdf_doc, pdf_source = _pdfium_document(att, pdf_reader)
+        with _PDFIUM_LOCK:
+            num_pages = len(pdf_doc)
         
         # Limit to reasonable number of pages (respect pages command if present)
         if 'pages' in att.commands:
@@ -453,36 +1002,11 @@ def images(att: Attachment, pdf_reader: 'pdfplumber.PDF') -> Attachment:
             # Default limit
             max_pages = min(num_pages, 10)
         
-        for page_idx in range(max_pages):
-            page = pdf_doc[page_idx]
-            
-            # Render at 2x scale for better quality
-            pil_image = page.render(scale=2).to_pil()
-            
-            # Apply resize if specified
-            if resize:
-                if 'x' in resize:
-                    # Format: 800x600
-                    w, h = map(int, resize.split('x'))
-                    pil_image = pil_image.resize((w, h))
-                elif resize.endswith('%'):
-                    # Format: 50%
-                    scale = int(resize[:-1]) / 100
-                    new_width = int(pil_image.width * scale)
-                    new_height = int(pil_image.height * scale)
-                    pil_image = pil_image.resize((new_width, new_height))
-            
-            # Convert to PNG bytes
-            img_byte_arr = io.BytesIO()
-            pil_image.save(img_byte_arr, format='PNG')
-            png_bytes = img_byte_arr.getvalue()
-            
-            # Encode as base64 data URL
-            b64_string = base64.b64encode(png_bytes).decode('utf-8')
-            images.append(f"data:image/png;base64,{b64_string}")
-        
-        # Clean up PDF document
-        pdf_doc.close()
+        # Rendered pages are cached on disk by PDF content only when opted in
+        cache_id = _pdf_content_hash(att, pdf_source) if _page_cache_enabled(att) else None
+        images = _render_pdf_images(pdf_doc, range(max_pages), resize,
+                                    image_format=image_format, quality=image_quality,
+                                    cache_id=cache_id)
         
         # Add images to attachment
         att.images.extend(images)
@@ -491,7 +1015,8 @@ def images(att: Attachment, pdf_reader: 'pdfplumber.PDF') -> Attachment:
         att.metadata.update({
             'pdf_pages_rendered': len(images),
             'pdf_total_pages': num_pages,
-            'pdf_resize_applied': resize if resize else None
+            'pdf_resize_applied': resize if resize else None,
+            'pdf_image_format': 'jpeg' if image_format.lower() in ('jpeg', 'jpg') else 'png'
         })
         
         return att
@@ -502,68 +1027,250 @@ def images(att: Attachment, pdf_reader: 'pdfplumber.PDF') -> Attachment:
         return att
 
 
+def _pdfium_source(att: Attachment, pdf_reader) -> 'str | bytes':
+    """
+    Pick what to hand pypdfium2 for a pdfplumber-loaded PDF.
+    
+    A path is preferred (the CropBox-fixed temp file first) so pdfium loads
+    pages lazily; bytes are read only when the PDF exists solely as a stream.
+    """
+    stream = getattr(pdf_reader, 'stream', None)
+    candidates = (att.metadata.get('temp_pdf_path'), getattr(stream, 'name', None), att.path)
+    for candidate in candidates:
+        if isinstance(candidate, str) and os.path.isfile(candidate):
+            return candidate
+    
+    if stream:
+        # Save current position, read the PDF bytes, restore position
+        original_pos = stream.tell()
+        stream.seek(0)
+        pdf_bytes = stream.read()
+        stream.seek(original_pos)
+        return pdf_bytes
+    
+    raise FileNotFoundError("Cannot access PDF bytes for rendering")
+
+
+def _pdfium_document(att: Attachment, pdf_reader) -> tuple:
+    """
+    Open (once per attachment) the pypdfium2 document for a pdfplumber-loaded PDF.
+    
+    images(pdf_reader) and ocr(pdf_reader) share the returned (document,
+    source) pair instead of each opening the file. The document is tied to
+    the pdfplumber object like the page text cache. It is kept on the
+    attachment itself rather than in metadata, which splitters copy into
+    every chunk, so only the attachment that opened it closes it in
+    Attachment.cleanup().
+    """
+    entry = att._pdfium_doc
+    if entry is None or entry['obj'] is not pdf_reader:
+        if entry is not None:
+            entry['close']()
+        # Prefer a file path so pdfium reads pages on demand instead of copying the whole file
+        pdf_source = _pdfium_source(att, pdf_reader)
+        with _PDFIUM_LOCK:
+            pdf_doc = _pdfium.PdfDocument(pdf_source)
+        
+        def close():
+            with _PDFIUM_LOCK:
+                pdf_doc.close()
+        
+        entry = {'obj': pdf_reader, 'doc': pdf_doc, 'source': pdf_source, 'close': close}
+        att._pdfium_doc = entry
+    return entry['doc'], entry['source']
+
+
+def _encode_buffer() -> io.BytesIO:
+    """Return this thread's reusable BytesIO, emptied and rewound."""
+    buf = getattr(_ENCODE_BUF, 'buf', None)
+    if buf is None:
+        _ENCODE_BUF.buf = buf = io.BytesIO()
+    else:
+        buf.seek(0)
+        buf.truncate(0)
+    return buf
+
+
+def _buffer_b64(buf: io.BytesIO) -> bytes:
+    """Base64-encode a BytesIO's contents through a view rather than a copy."""
+    # Release the view before returning; the reusable buffer cannot be truncated while it is exported
+    with buf.getbuffer() as view:
+        return base64.b64encode(view)
+
+
+_RESIZE_RE = re.compile(r'(\d+)x(\d+)|(\d+)%')
+
+
+def _parse_resize(resize):
+    """Parse a DSL resize spec into ('abs', w, h), ('scale', factor) or None."""
+    match = _RESIZE_RE.fullmatch(resize.strip()) if resize else None
+    if match is None:
+        return None
+    if match.group(3) is not None:
+        # Format: 50%
+        return ('scale', int(match.group(3)) / 100)
+    # Format: 800x600
+    return ('abs', int(match.group(1)), int(match.group(2)))
+
+
+def _apply_resize(img, resize):
+    """
+    Apply a DSL resize spec ('800x600' or '50%', or a parsed plan) to a PIL image.
+    
+    Uses Lanczos with reducing_gap so large downscales are box-reduced first,
+    which is much faster than a full Lanczos pass at near-identical quality.
+    """
+    plan = _parse_resize(resize) if isinstance(resize, str) else resize
+    if not plan:
+        return img
+    from PIL import Image
+    lanczos = getattr(Image, 'Resampling', Image).LANCZOS
+    if plan[0] == 'abs':
+        return img.resize(plan[1:], lanczos, reducing_gap=2.0)
+    scale = plan[1]
+    return img.resize((int(img.width * scale), int(img.height * scale)), lanczos, reducing_gap=2.0)
+
+
+def _pdf_render_scale(page, resize_plan):
+    """
+    Pick the pdfium render scale for a parsed resize plan, plus any resize still needed.
+    
+    Pages render at 2x by default. 'N%' renders directly at N% of that, and
+    'WxH' renders just large enough to cover the box so only a small final
+    resize to the exact size remains.
+    """
+    if resize_plan is None:
+        return 2, None
+    if resize_plan[0] == 'scale':
+        return 2 * resize_plan[1], None
+    _, w, h = resize_plan
+    page_w, page_h = page.get_size()
+    return max(w / page_w, h / page_h), resize_plan
+
+
+def _render_pdf_images(pdf_doc, page_indices, resize=None,
+                       image_format='png', quality=85, cache_id=None) -> list:
+    """
+    Render 0-based pages of a pypdfium2 document to image data URLs, in order.
+    
+    Only the pdfium render call is serialized under _PDFIUM_LOCK; bitmap to
+    PIL conversion, resizing, encoding and base64 run in a small thread pool
+    while the next page renders. 'WxH' and 'N%' resize specs are applied
+    through the render scale (see _pdf_render_scale), so pages are never
+    rendered at full size only to be shrunk. PNG uses fast zlib settings
+    since the output is embedded in prompts, not archived; image_format='jpeg'
+    trades losslessness for much faster encoding and smaller payloads.
+    
+    With cache_id (a content hash of the PDF), each page's data URL is kept
+    in the on-disk page cache and later calls with the same settings skip
+    rendering it.
+    """
+    from collections import deque
+    from concurrent.futures import Future, ThreadPoolExecutor
+    
+    jpeg = image_format.lower() in ('jpeg', 'jpg')
+    resize_plan = _parse_resize(resize)
+    data_url_prefix = b"data:image/jpeg;base64," if jpeg else b"data:image/png;base64,"
+    
+    def encode(bitmap, post_resize):
+        try:
+            # to_pil() only wraps the bitmap's buffer; no pdfium call, so no lock needed
+            pil_image = _apply_resize(bitmap.to_pil(), post_resize)
+            
+            img_byte_arr = _encode_buffer()
+            if jpeg:
+                if pil_image.mode not in ('RGB', 'L'):
+                    pil_image = pil_image.convert('RGB')
+                pil_image.save(img_byte_arr, format='JPEG', quality=quality, optimize=False)
+            else:
+                pil_image.save(img_byte_arr, format='PNG', optimize=False, compress_level=1)
+            del pil_image
+        finally:
+            # Destroy the bitmap explicitly under the lock; its finalizer would
+            # otherwise call into pdfium from this thread while a page renders
+            with _PDFIUM_LOCK:
+                bitmap.close()
+        # One ASCII decode of the whole data URL instead of decode + f-string copy
+        return (data_url_prefix + _buffer_b64(img_byte_arr)).decode('ascii')
+    
+    def cache_name(page_idx):
+        encoding = f"jpeg{quality}" if jpeg else "png"
+        return f"{cache_id}-{page_idx}-{resize or 'full'}-{encoding}.txt".replace(os.sep, '_')
+    
+    def encode_and_store(page_idx, bitmap, post_resize):
+        data_url = encode(bitmap, post_resize)
+        _page_cache_write(cache_name(page_idx), data_url)
+        return data_url
+    
+    page_indices = list(page_indices)
+    cached = {}
+    if cache_id:
+        for page_idx in page_indices:
+            data_url = _page_cache_read(cache_name(page_idx))
+            if data_url is not None:
+                cached[page_idx] = data_url
+    workers = max(1, min(4, os.cpu_count() or 1, len(page_indices) - len(cached)))
+    
+    images = []  # data URLs and encoder futures, in page order
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for page_idx in page_indices:
+            if page_idx in cached:
+                images.append(cached[page_idx])
+                continue
+            with _PDFIUM_LOCK:
+                page = pdf_doc[page_idx]
+                try:
+                    scale, post_resize = _pdf_render_scale(page, resize_plan)
+                    bitmap = page.render(scale=scale)
+                finally:
+                    page.close()
+            if cache_id:
+                future = executor.submit(encode_and_store, page_idx, bitmap, post_resize)
+            else:
+                future = executor.submit(encode, bitmap, post_resize)
+            images.append(future)
+            pending.append(future)
+            
+            # Bound the number of full-size renders waiting for the encoder
+            if len(pending) > 2 * workers:
+                pending.popleft().result()
+        
+        images = [image.result() if isinstance(image, Future) else image for image in images]
+    
+    if cache_id and len(cached) < len(page_indices):
+        _prune_cache('pdf-pages')
+    return images
+
+
 @presenter
 def images(att: Attachment, doc: 'docx.Document') -> Attachment:
     """Convert DOCX pages to PNG images by converting to PDF first, then rendering."""
-    try:
-        # Try to import required libraries
-        import pypdfium2 as pdfium
-        import subprocess
-        import shutil
-        import tempfile
-        import os
-        from pathlib import Path
-        import base64
-        import io
-    except ImportError as e:
-        att.metadata['docx_images_error'] = f"Required libraries not installed: {e}. Install with: pip install pypdfium2"
+    if _pdfium is None:
+        att.metadata['docx_images_error'] = "pypdfium2 not installed. Install with: pip install pypdfium2"
         return att
     
-    # Get resize parameter from DSL commands
+    # Get resize and encoding parameters from DSL commands
     resize = att.commands.get('resize_images')
+    image_format = att.commands.get('image_format', 'png')
+    image_quality = int(att.commands.get('image_quality', 85))
     
     images = []
     
     try:
-        # Convert DOCX to PDF first (using LibreOffice/soffice)
-        def convert_docx_to_pdf(docx_path: str) -> str:
-            """Convert DOCX to PDF using LibreOffice/soffice."""
-            # Try to find LibreOffice or soffice
-            soffice = shutil.which("libreoffice") or shutil.which("soffice")
-            if not soffice:
-                raise RuntimeError("LibreOffice/soffice not found. Install LibreOffice to convert DOCX to PDF.")
-            
-            # Create temporary directory for PDF output
-            temp_dir = tempfile.mkdtemp()
-            docx_path_obj = Path(docx_path)
-            
-            # Run LibreOffice conversion
-            subprocess.run(
-                [soffice, "--headless", "--convert-to", "pdf", "--outdir", temp_dir, str(docx_path_obj)],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=60  # 60 second timeout
-            )
-            
-            # Find the generated PDF
-            pdf_path = Path(temp_dir) / (docx_path_obj.stem + ".pdf")
-            if not pdf_path.exists():
-                raise RuntimeError(f"PDF conversion failed - output file not found: {pdf_path}")
-            
-            return str(pdf_path)
-        
         # Convert DOCX to PDF
         if not att.path:
             raise RuntimeError("No file path available for DOCX conversion")
         
-        pdf_path = convert_docx_to_pdf(att.path)
+        # Cached by content hash, so re-presenting the same file skips LibreOffice
+        pdf_path = _cached_soffice_convert(att.path, 'docx2pdf')
         
-        try:
-            # Open the PDF with pypdfium2
-            pdf_doc = pdfium.PdfDocument(pdf_path)
+        # Open the PDF with pypdfium2
+        with _PDFIUM_LOCK:
+            pdf_doc = _pdfium.PdfDocument(pdf_path)
             num_pages = len(pdf_doc)
-            
+        
+        try:
             # Get selected pages (respects pages DSL command)
             page_indices = att.metadata.get('selected_pages', range(1, num_pages + 1))
             
@@ -577,45 +1284,14 @@ def images(att: Attachment, doc: 'docx.Document') -> Attachment:
             max_pages = min(num_pages, 20)
             page_indices = page_indices[:max_pages]
             
-            for page_idx in page_indices:
-                if 0 <= page_idx < num_pages:
-                    page = pdf_doc[page_idx]
-                    
-                    # Render at 2x scale for better quality (like PDF processor)
-                    pil_image = page.render(scale=2).to_pil()
-                    
-                    # Apply resize if specified
-                    if resize:
-                        if 'x' in resize:
-                            # Format: 800x600
-                            w, h = map(int, resize.split('x'))
-                            pil_image = pil_image.resize((w, h), pil_image.Resampling.LANCZOS)
-                        elif resize.endswith('%'):
-                            # Format: 50%
-                            scale = int(resize[:-1]) / 100
-                            new_width = int(pil_image.width * scale)
-                            new_height = int(pil_image.height * scale)
-                            pil_image = pil_image.resize((new_width, new_height), pil_image.Resampling.LANCZOS)
-                    
-                    # Convert to PNG bytes
-                    img_byte_arr = io.BytesIO()
-                    pil_image.save(img_byte_arr, format='PNG')
-                    png_bytes = img_byte_arr.getvalue()
-                    
-                    # Encode as base64 data URL (consistent with PDF processor)
-                    b64_string = base64.b64encode(png_bytes).decode('utf-8')
-                    images.append(f"data:image/png;base64,{b64_string}")
-            
-            # Clean up PDF document
-            pdf_doc.close()
+            page_indices = [page_idx for page_idx in page_indices if 0 <= page_idx < num_pages]
+            images = _render_pdf_images(pdf_doc, page_indices, resize,
+                                        image_format=image_format, quality=image_quality)
             
         finally:
-            # Clean up temporary PDF file
-            try:
-                os.unlink(pdf_path)
-                os.rmdir(os.path.dirname(pdf_path))
-            except:
-                pass  # Ignore cleanup errors
+            # Clean up PDF document (the converted PDF itself stays in the cache)
+            with _PDFIUM_LOCK:
+                pdf_doc.close()
         
         # Add images to attachment
         att.images.extend(images)
@@ -647,25 +1323,26 @@ def images(att: Attachment, doc: 'docx.Document') -> Attachment:
 def summary(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
     """Add summary statistics to text."""
     try:
-        summary_text = f"\n## Summary Statistics\n\n"
-        summary_text += f"- **Rows**: {len(df)}\n"
-        summary_text += f"- **Columns**: {len(df.columns)}\n"
+        parts = [f"\n## Summary Statistics\n\n",
+                 f"- **Rows**: {len(df)}\n",
+                 f"- **Columns**: {len(df.columns)}\n"]
         
         # Try to get memory usage
         try:
             memory_usage = df.memory_usage(deep=True).sum()
-            summary_text += f"- **Memory Usage**: {memory_usage} bytes\n"
+            parts.append(f"- **Memory Usage**: {memory_usage} bytes\n")
         except:
-            summary_text += f"- **Memory Usage**: Not available\n"
+            parts.append(f"- **Memory Usage**: Not available\n")
         
         # Get numeric columns
         try:
             numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-            summary_text += f"- **Numeric Columns**: {numeric_cols}\n"
+            parts.append(f"- **Numeric Columns**: {numeric_cols}\n")
         except:
-            summary_text += f"- **Numeric Columns**: Not available\n"
+            parts.append(f"- **Numeric Columns**: Not available\n")
         
-        att.text += summary_text + "\n"
+        parts.append("\n")
+        att.text += "".join(parts)
     except Exception as e:
         att.text += f"\n*Error generating summary: {e}*\n\n"
     
@@ -676,9 +1353,10 @@ def summary(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
 def head(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
     """Add data preview to text (additive)."""
     try:
-        head_text = f"\n## Data Preview\n\n"
-        head_text += df.head().to_markdown(index=False)
-        att.text += head_text + "\n\n"  # Additive: append to existing text
+        head_df = df.head()
+        preview = _df_rendered(att, df, ('head',),
+                               lambda: _fast_to_markdown(head_df) or head_df.to_markdown(index=False))
+        att.text += f"\n## Data Preview\n\n{preview}\n\n"  # Additive: append to existing text
     except Exception as e:
         att.text += f"\n*Error generating preview: {e}*\n\n"
     
@@ -689,14 +1367,14 @@ def head(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
 def metadata(att: Attachment, pdf: 'pdfplumber.PDF') -> Attachment:
     """Extract PDF metadata to text."""
     try:
-        meta_text = f"\n## Document Metadata\n\n"
+        parts = ["\n## Document Metadata\n\n"]
         if hasattr(pdf, 'metadata') and pdf.metadata:
-            for key, value in pdf.metadata.items():
-                meta_text += f"- **{key}**: {value}\n"
+            parts.extend(f"- **{key}**: {value}\n" for key, value in pdf.metadata.items())
         else:
-            meta_text += "*No metadata available*\n"
+            parts.append("*No metadata available*\n")
+        parts.append("\n")
         
-        att.text += meta_text + "\n"
+        att.text += "".join(parts)
     except Exception as e:
         att.text += f"\n*Error extracting metadata: {e}*\n\n"
     
@@ -707,10 +1385,11 @@ def metadata(att: Attachment, pdf: 'pdfplumber.PDF') -> Attachment:
 def thumbnails(att: Attachment, pdf: 'pdfplumber.PDF') -> Attachment:
     """Generate page thumbnails from PDF."""
     try:
-        pages_to_process = att.metadata.get('selected_pages', range(1, min(4, len(pdf.pages) + 1)))
+        n_pages = len(pdf.pages)
+        pages_to_process = att.metadata.get('selected_pages', range(1, min(4, n_pages + 1)))
         
         for page_num in pages_to_process:
-            if 1 <= page_num <= len(pdf.pages):
+            if 1 <= page_num <= n_pages:
                 # Placeholder for PDF page thumbnail
                 att.images.append(f"thumbnail_page_{page_num}_base64_placeholder")
     except:
@@ -736,14 +1415,51 @@ def contact_sheet(att: Attachment, pres: 'pptx.Presentation') -> Attachment:
 # CSV PRESENTER
 @presenter
 def csv(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
-    """Convert pandas DataFrame to CSV."""
+    """
+    Convert pandas DataFrame to CSV with df.to_csv.
+    
+    [csv_engine:arrow] uses pyarrow's faster C writer when installed, in
+    pyarrow's dialect (see _arrow_csv).
+    """
     try:
-        att.text += df.to_csv(index=False)
+        use_arrow = att.commands.get('csv_engine', '').lower() == 'arrow'
+        # The index is not written; dropping a MultiIndex first avoids pandas' slow path for it
+        frame = df.reset_index(drop=True) if df.index.nlevels > 1 else df
+        # append_text keeps a large CSV out of a join with the existing text
+        att.append_text((use_arrow and _arrow_csv(frame)) or frame.to_csv(index=False))
     except Exception as e:
         att.text += f"*Error converting to CSV: {e}*\n"
     return att
 
 
+def _arrow_csv(df: 'pandas.DataFrame') -> str:
+    """
+    Write df as CSV with pyarrow, or return '' if pyarrow is missing or can't convert it.
+    
+    The dialect differs from df.to_csv: the header and every string cell are
+    quoted, booleans are written as true/false, and timestamps carry
+    fractional seconds (e.g. 2024-01-01 00:00:00.000000).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        return ""
+    
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        try:
+            options = pacsv.WriteOptions(quoting_style='needed')
+        except TypeError:
+            options = pacsv.WriteOptions()
+        buf = io.BytesIO()
+        pacsv.write_csv(table, buf, write_options=options)
+        return buf.getvalue().decode('utf-8')
+    except Exception:
+        # Mixed-type object columns etc. - let pandas handle it
+        return ""
+
+
 # XML PRESENTER  
 @presenter
 def xml(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
@@ -755,6 +1471,32 @@ def xml(att: Attachment, df: 'pandas.DataFrame') -> Attachment:
     return att
 
 
+
+# reprlib.Repr instances keyed by character cap, built on first use
+_BOUNDED_REPRS = {}
+
+
+def _truncrepr(obj, n: int) -> str:
+    """
+    String form of obj capped at n characters.
+    
+    Builtin containers go through reprlib so huge lists/dicts are never fully
+    stringified; strings are sliced directly and other objects keep str().
+    """
+    if isinstance(obj, str):
+        return obj[:n]
+    if isinstance(obj, (list, tuple, dict, set, frozenset)):
+        r = _BOUNDED_REPRS.get(n)
+        if r is None:
+            import reprlib
+            r = reprlib.Repr()
+            r.maxstring = n
+            r.maxother = n
+            _BOUNDED_REPRS[n] = r
+        return r.repr(obj)[:n]
+    return str(obj)[:n]
+
+
 # FALLBACK PRESENTERS
 @presenter
 def head(att: Attachment) -> Attachment:
@@ -764,46 +1506,44 @@ def head(att: Attachment) -> Attachment:
             head_result = att._obj.head()
             att.text += f"\n## Preview\n\n{str(head_result)}\n\n"
         except:
-            att.text += f"\n## Preview\n\n{str(att._obj)[:200]}\n\n"
+            att.text += f"\n## Preview\n\n{_truncrepr(att._obj, 200)}\n\n"
     else:
-        att.text += f"\n## Preview\n\n{str(att._obj)[:200]}\n\n"
+        att.text += f"\n## Preview\n\n{_truncrepr(att._obj, 200)}\n\n"
     return att
 
 
+# Metadata keys shown by the fallback metadata presenter, with their display names
+# A tuple, not a set: metadata() walks it, and its order is the display order
+_USER_FRIENDLY_KEYS = (
+    'format', 'size', 'mode', 'content_type', 'status_code',
+    'file_size', 'pdf_pages_rendered', 'pdf_total_pages',
+    'collection_size', 'from_zip', 'zip_filename'
+)
+_DISPLAY_KEYS = {key: key.replace('_', ' ').title() for key in _USER_FRIENDLY_KEYS}
+_DISPLAY_KEYS.update(pdf_pages_rendered='Pages Rendered', pdf_total_pages='Total Pages')
+
+
 @presenter
 def metadata(att: Attachment) -> Attachment:
     """Add attachment metadata to text (user-friendly version)."""
     try:
-        # Filter metadata to show only user-relevant information
-        user_friendly_keys = {
-            'format', 'size', 'mode', 'content_type', 'status_code', 
-            'file_size', 'pdf_pages_rendered', 'pdf_total_pages',
-            'collection_size', 'from_zip', 'zip_filename'
-        }
-        
         # Collect user-friendly metadata
-        relevant_meta = {}
-        for key, value in att.metadata.items():
-            if key in user_friendly_keys:
-                relevant_meta[key] = value
-            elif key.endswith('_error'):
-                # Show errors as they're important for users
-                relevant_meta[key] = value
+        meta = att.metadata
+        relevant_meta = {key: meta[key] for key in _USER_FRIENDLY_KEYS if key in meta}
+        # Show errors as they're important for users
+        relevant_meta.update((key, value) for key, value in meta.items() if key.endswith('_error'))
         
         if relevant_meta:
-            meta_text = f"\n## File Info\n\n"
+            parts = ["\n## File Info\n\n"]
             for key, value in relevant_meta.items():
                 # Format key names to be more readable
-                display_key = key.replace('_', ' ').title()
+                display_key = _DISPLAY_KEYS.get(key) or key.replace('_', ' ').title()
                 if key == 'size' and isinstance(value, tuple):
-                    meta_text += f"- **{display_key}**: {value[0]} × {value[1]} pixels\n"
-                elif key == 'pdf_pages_rendered':
-                    meta_text += f"- **Pages Rendered**: {value}\n"
-                elif key == 'pdf_total_pages':
-                    meta_text += f"- **Total Pages**: {value}\n"
+                    parts.append(f"- **{display_key}**: {value[0]} × {value[1]} pixels\n")
                 else:
-                    meta_text += f"- **{display_key}**: {value}\n"
-            att.text += meta_text + "\n"
+                    parts.append(f"- **{display_key}**: {value}\n")
+            parts.append("\n")
+            att.text += "".join(parts)
         # If no relevant metadata, don't add anything (cleaner output)
         
     except Exception as e:
@@ -815,15 +1555,15 @@ def metadata(att: Attachment) -> Attachment:
 def summary(att: Attachment) -> Attachment:
     """Fallback summary presenter for non-DataFrame objects."""
     try:
-        summary_text = f"\n## Object Summary\n\n"
-        summary_text += f"- **Type**: {type(att._obj).__name__}\n"
+        parts = [f"\n## Object Summary\n\n",
+                 f"- **Type**: {type(att._obj).__name__}\n"]
         if hasattr(att._obj, '__len__'):
             try:
-                summary_text += f"- **Length**: {len(att._obj)}\n"
+                parts.append(f"- **Length**: {len(att._obj)}\n")
             except:
                 pass
-        summary_text += f"- **String representation**: {str(att._obj)[:100]}...\n"
-        att.text += summary_text + "\n"
+        parts.append(f"- **String representation**: {_truncrepr(att._obj, 100)}...\n\n")
+        att.text += "".join(parts)
     except Exception as e:
         att.text += f"\n*Error generating summary: {e}*\n\n"
     return att
@@ -833,14 +1573,14 @@ def summary(att: Attachment) -> Attachment:
 def markdown(att: Attachment) -> Attachment:
     """Fallback markdown presenter for unknown types."""
     att.text += f"# {att.path}\n\n*Object type: {type(att._obj)}*\n\n"
-    att.text += f"```\n{str(att._obj)[:500]}\n```\n\n"
+    att.text += f"```\n{_truncrepr(att._obj, 500)}\n```\n\n"
     return att
 
 
 @presenter
 def text(att: Attachment) -> Attachment:
     """Fallback text presenter for unknown types."""
-    att.text += f"{att.path}: {str(att._obj)[:500]}\n\n"
+    att.text += f"{att.path}: {_truncrepr(att._obj, 500)}\n\n"
     return att
 
 
@@ -854,51 +1594,96 @@ def images(att: Attachment) -> Attachment:
 # This maintains clean separation: present extracts, refine processes
 
 # OCR PRESENTER for scanned PDFs
+# (tesserocr, pytesseract) or the ImportError, resolved on the first OCR call
+_OCR_MODULES = None
+
+
+def _ocr_modules() -> tuple:
+    """
+    Import the OCR engine once per process and return (tesserocr, pytesseract).
+    
+    Exactly one is a module, the other None. A failed import is remembered
+    and re-raised, so systems without OCR don't search sys.path on every call.
+    """
+    import importlib
+    global _OCR_MODULES
+    if _OCR_MODULES is None:
+        try:
+            try:
+                import tesserocr
+                pytesseract = None
+            except ImportError:
+                tesserocr = None
+                import pytesseract
+            # Pages reach the engine as PIL images; fail here if Pillow is missing
+            importlib.import_module('PIL.Image')
+            _OCR_MODULES = (tesserocr, pytesseract)
+        except ImportError as e:
+            _OCR_MODULES = e
+    if isinstance(_OCR_MODULES, ImportError):
+        raise _OCR_MODULES.with_traceback(None)
+    return _OCR_MODULES
+
+
 @presenter
 def ocr(att: Attachment, pdf_reader: 'pdfplumber.PDF') -> Attachment:
     """
-    Extract text from scanned PDF using OCR (pytesseract).
+    Extract text from scanned PDF using OCR (tesserocr or pytesseract).
     
     This presenter is useful for scanned PDFs with no extractable text.
-    Requires: pip install pytesseract pillow
+    Requires: pip install pytesseract pillow (or pip install tesserocr, which is faster)
     Also requires tesseract binary: apt-get install tesseract-ocr (Ubuntu) or brew install tesseract (Mac)
+    
+    When tesserocr is installed, pages go through the Tesseract C API with the
+    language model loaded once and reused across calls; otherwise pytesseract
+    runs the tesseract binary. Pages are OCR'd by up to $OCR_CONCURRENCY workers
+    (default: CPU count, capped at 8), each limited to one OpenMP thread unless
+    OMP_THREAD_LIMIT is set; parallelism across pages beats tesseract's
+    intra-page threading. Pages render at 2x, or 1x for large type;
+    [ocr_scale:N] forces a scale. Pages that already have an embedded text
+    layer use it and skip OCR, unless [ocr_text_layer:false]. With
+    [cache:true] (or $ATTACHMENTS_DISK_CACHE=1) OCR text is kept per page in
+    the on-disk page cache and reused for the same PDF.
+    [ocr_psm:N] and [ocr_oem:N] set Tesseract's page segmentation and engine
+    modes; e.g. [ocr_psm:6] is faster on single-column pages.
     """
+    from collections import deque
+    from concurrent.futures import Future, ThreadPoolExecutor
+    
     try:
-        import pytesseract
-        from PIL import Image
-        import pypdfium2 as pdfium
-        import io
+        tesserocr, pytesseract = _ocr_modules()
+        if _pdfium is None:
+            raise ImportError("No module named 'pypdfium2'")
     except ImportError as e:
-        att.text += f"\n## OCR Text Extraction\n\n"
-        att.text += f"⚠️ **OCR not available**: Missing dependencies.\n\n"
-        att.text += f"To enable OCR for scanned PDFs:\n"
-        att.text += f"```bash\n"
-        att.text += f"pip install pytesseract pypdfium2\n"
-        att.text += f"# Ubuntu/Debian:\n"
-        att.text += f"sudo apt-get install tesseract-ocr\n"
-        att.text += f"# macOS:\n"
-        att.text += f"brew install tesseract\n"
-        att.text += f"```\n\n"
-        att.text += f"Error: {e}\n\n"
+        att.text += "".join([
+            "\n## OCR Text Extraction\n\n",
+            "⚠️ **OCR not available**: Missing dependencies.\n\n",
+            "To enable OCR for scanned PDFs:\n",
+            "```bash\n",
+            "pip install pytesseract pypdfium2\n",
+            "# or, faster (in-process Tesseract API):\n",
+            "pip install tesserocr pypdfium2\n",
+            "# Ubuntu/Debian:\n",
+            "sudo apt-get install tesseract-ocr\n",
+            "# macOS:\n",
+            "brew install tesseract\n",
+            "```\n\n",
+            f"Error: {e}\n\n",
+        ])
         return att
     
-    att.text += f"\n## OCR Text Extraction\n\n"
+    parts = ["\n## OCR Text Extraction\n\n"]
     
     try:
-        # Get PDF bytes for pypdfium2
-        if 'temp_pdf_path' in att.metadata:
-            with open(att.metadata['temp_pdf_path'], 'rb') as f:
-                pdf_bytes = f.read()
-        elif att.path:
-            with open(att.path, 'rb') as f:
-                pdf_bytes = f.read()
-        else:
-            att.text += "⚠️ **OCR failed**: Cannot access PDF file.\n\n"
+        # Open with pypdfium2 (shared with images(); path preferred over bytes)
+        try:
+            pdf_doc, pdf_source = _pdfium_document(att, pdf_reader)
+        except FileNotFoundError:
+            parts.append("⚠️ **OCR failed**: Cannot access PDF file.\n\n")
+            att.text += "".join(parts)
             return att
-        
-        # Open with pypdfium2
-        pdf_doc = pdfium.PdfDocument(pdf_bytes)
-        num_pages = len(pdf_doc)
+        with _PDFIUM_LOCK:
+            num_pages = len(pdf_doc)
         
         # Process pages (limit for performance)
         if 'selected_pages' in att.metadata:
@@ -906,304 +1691,746 @@ def ocr(att: Attachment, pdf_reader: 'pdfplumber.PDF') -> Attachment:
         else:
             # Limit OCR to first 5 pages by default (OCR is slow)
             pages_to_process = range(1, min(6, num_pages + 1))
-        
-        total_ocr_text = ""
-        successful_pages = 0
-        
-        for page_num in pages_to_process:
-            if 1 <= page_num <= num_pages:
-                try:
-                    page = pdf_doc[page_num - 1]
-                    
-                    # Render page as image
-                    pil_image = page.render(scale=2).to_pil()  # Higher scale for better OCR
-                    
-                    # Perform OCR
-                    page_text = pytesseract.image_to_string(pil_image, lang='eng')
+        n_to_process = len(pages_to_process)
+        
+        # Collect (page_num, text, status) rows; formatting happens in one pass below.
+        # With tesserocr each rendered page goes straight to a pooled API
+        # instance. With pytesseract, pages are written to disk and handed to
+        # tesseract in batches through a list file, so each tesseract process
+        # initializes once per batch. Either way pages run in parallel.
+        # pdfium itself is not thread-safe, so rendering stays on this thread;
+        # everything downstream of the bitmap (PNG encoding, OCR) runs off it,
+        # so the next page renders while earlier ones are encoded and OCR'd.
+        workers = _ocr_concurrency()
+        if workers > 1:
+            # Tesseract's own OpenMP threading scales poorly and fights with
+            # page-level parallelism; pytesseract's subprocesses inherit this.
+            # setdefault keeps an explicit user setting.
+            os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+        valid_pages = [page_num for page_num in pages_to_process if 1 <= page_num <= num_pages]
+        
+        # Pages that already carry a real text layer don't need tesseract
+        if att.commands.get('ocr_text_layer', 'true').lower() == 'false':
+            native_texts = {}
+        else:
+            native_texts = _native_page_texts(att, pdf_reader, pdf_doc, valid_pages)
+        ocr_pages = [page_num for page_num in valid_pages if page_num not in native_texts]
+        
+        # OCR results are cached on disk by PDF content, engine and scale when opted in
+        engine = 'tesserocr' if tesserocr is not None else 'pytesseract'
+        psm, oem = _tesseract_options(att)
+        tess_config = _tesseract_config(psm, oem)
+        cached_texts = {}
+        ocr_cache_id = None
+        if _page_cache_enabled(att):
+            ocr_cache_id = (f"{_pdf_content_hash(att, pdf_source)}-ocr-{engine}"
+                            f"-{att.commands.get('ocr_scale', 'auto')}-psm{psm}-oem{oem}")
+            for page_num in ocr_pages:
+                page_text = _page_cache_read(f"{ocr_cache_id}-{page_num}.txt")
+                if page_text is not None:
+                    cached_texts[page_num] = page_text
+            ocr_pages = [page_num for page_num in ocr_pages if page_num not in cached_texts]
+        
+        batch_size = min(_OCR_BATCH_MAX, max(1, -(-len(ocr_pages) // workers)))
+        rows = [(page_num, text, 'native') for page_num, text in native_texts.items()]
+        rows.extend(_ocr_row(page_num, text) for page_num, text in cached_texts.items())
+        batch = []
+        writes = []
+        in_flight = deque()
+        
+        with tempfile.TemporaryDirectory() as work_dir, \
+                ThreadPoolExecutor(max_workers=workers) as executor, \
+                ThreadPoolExecutor(max_workers=2) as writer:
+            # Render in grayscale (tesseract binarizes anyway), at 2x unless the type is large.
+            # tesserocr takes the grayscale bitmap's raw pixels; pytesseract needs PIL images to save
+            scale = _ocr_render_scale(att, pdf_doc, ocr_pages, pytesseract)
+            rendered = _render_pdf_pages(pdf_doc, ocr_pages, raw=tesserocr is not None, scale=scale, grayscale=True)
+            for page_num, image, render_error in rendered:
+                if render_error is not None:
+                    rows.append((page_num, str(render_error), 'failed'))
+                    continue
+                
+                if tesserocr is not None:
+                    future = executor.submit(_tesserocr_page, page_num, image, psm, oem)
+                    rows.append(future)
+                    in_flight.append(future)
                     
-                    if page_text.strip():
-                        att.text += f"### Page {page_num} (OCR)\n\n{page_text.strip()}\n\n"
-                        total_ocr_text += page_text.strip()
-                        successful_pages += 1
-                    else:
-                        att.text += f"### Page {page_num} (OCR)\n\n*[No text detected by OCR]*\n\n"
-                        
-                except Exception as e:
-                    att.text += f"### Page {page_num} (OCR)\n\n*[OCR failed: {str(e)}]*\n\n"
-        
-        # Clean up
-        pdf_doc.close()
+                    # Bound the number of rendered pages waiting for the OCR engine
+                    if len(in_flight) > 2 * workers:
+                        in_flight.popleft().result()
+                    continue
+                
+                png_path = os.path.join(work_dir, f"page_{page_num}.png")
+                writes.append(writer.submit(image.save, png_path, format='PNG', compress_level=1))
+                batch.append((page_num, png_path))
+                
+                if len(batch) >= batch_size:
+                    rows.append(executor.submit(_ocr_batch, pytesseract, batch, work_dir, writes, tess_config))
+                    batch, writes = [], []
+            
+            if batch:
+                rows.append(executor.submit(_ocr_batch, pytesseract, batch, work_dir, writes, tess_config))
+            
+            results = []
+            for row in rows:
+                if isinstance(row, Future):
+                    row = row.result()
+                if isinstance(row, list):
+                    results.extend(row)
+                else:
+                    results.append(row)
+        # Text-layer pages and render failures were recorded ahead of OCR batches; restore page order
+        order = {page_num: i for i, page_num in enumerate(valid_pages)}
+        results.sort(key=lambda row: order[row[0]])
+        
+        if ocr_cache_id:
+            fresh = set(ocr_pages)
+            for page_num, page_text, status in results:
+                if page_num in fresh and status in ('ok', 'empty'):
+                    _page_cache_write(f"{ocr_cache_id}-{page_num}.txt", page_text)
+            if fresh:
+                _prune_cache('pdf-pages')
+        
+        ocr_texts = [page_text for _, page_text, status in results if status == 'ok']
+        successful_pages = len(ocr_texts)
+        total_ocr_length = sum(len(page_text) for page_text in ocr_texts)
+        
+        parts.extend(_format_ocr_page(page_num, page_text, status)
+                     for page_num, page_text, status in results)
         
         # Add OCR summary
-        att.text += f"**OCR Summary**:\n"
-        att.text += f"- Pages processed: {len(pages_to_process)}\n"
-        att.text += f"- Pages with OCR text: {successful_pages}\n"
-        att.text += f"- Total OCR text length: {len(total_ocr_text)} characters\n\n"
+        parts.append(f"**OCR Summary**:\n"
+                     f"- Pages processed: {n_to_process}\n"
+                     f"- Pages with OCR text: {successful_pages}\n"
+                     f"- Pages with a text layer (OCR skipped): {len(native_texts)}\n"
+                     f"- Total OCR text length: {total_ocr_length} characters\n\n")
         
         # Update metadata
         att.metadata.update({
             'ocr_performed': True,
-            'ocr_pages_processed': len(pages_to_process),
+            'ocr_engine': engine,
+            'ocr_render_scale': scale,
+            'ocr_pages_processed': n_to_process,
             'ocr_pages_successful': successful_pages,
-            'ocr_text_length': len(total_ocr_text)
+            'ocr_text_length': total_ocr_length,
+            'ocr_skipped_pages': sorted(native_texts),
+            'ocr_cached_pages': sorted(cached_texts)
         })
         
     except Exception as e:
-        att.text += f"⚠️ **OCR failed**: {str(e)}\n\n"
+        parts.append(f"⚠️ **OCR failed**: {str(e)}\n\n")
         att.metadata['ocr_error'] = str(e)
     
-    return att
+    att.text += "".join(parts)
+    return att
+
+
+# Default cap on concurrent tesseract workers; past this, memory (~100 MB per
+# engine) and memory bandwidth grow faster than throughput
+_OCR_MAX_DEFAULT_WORKERS = 8
+
+
+def _ocr_concurrency() -> int:
+    """Number of tesseract processes to run at once: $OCR_CONCURRENCY, else the CPU count (capped)."""
+    try:
+        return max(1, int(os.environ.get('OCR_CONCURRENCY', '')))
+    except ValueError:
+        return min(os.cpu_count() or 1, _OCR_MAX_DEFAULT_WORKERS)
+
+
+# Upper bound on pages per tesseract list file; very long lists have been reported to hang
+_OCR_BATCH_MAX = 32
+
+
+def _tesseract_options(att: Attachment) -> tuple:
+    """(psm, oem) from [ocr_psm:N] / [ocr_oem:N]; None keeps Tesseract's default."""
+    return tuple(int(att.commands[key]) if key in att.commands else None
+                 for key in ('ocr_psm', 'ocr_oem'))
+
+
+def _tesseract_config(psm, oem) -> str:
+    """pytesseract config string for the (psm, oem) options."""
+    return " ".join(f"--{flag} {value}" for flag, value in (('psm', psm), ('oem', oem))
+                    if value is not None)
+
+
+def _ocr_page(pytesseract, page_num: int, image, config: str = '') -> tuple:
+    """OCR one page (PIL image or file path) into a (page_num, text, status) row."""
+    try:
+        page_text = pytesseract.image_to_string(image, lang='eng', config=config)
+    except (pytesseract.TesseractError, OSError) as e:
+        return page_num, str(e), 'failed'
+    
+    return _ocr_row(page_num, page_text)
+
+
+# Idle tesserocr API instances by OCR engine mode; each holds a loaded
+# language model and serves one thread at a time
+_TESS_APIS = {}
+_TESS_APIS_LOCK = threading.Lock()
+
+
+@contextmanager
+def _pooled_tess_api(psm=None, oem=None):
+    """
+    Check a tesserocr API instance out of the pool (creating one if needed) and return it after use.
+    
+    The engine mode is fixed when an instance loads its model, so instances
+    are pooled per oem; the page segmentation mode is set on each checkout.
+    """
+    from tesserocr import PyTessBaseAPI, PSM
+    
+    with _TESS_APIS_LOCK:
+        idle = _TESS_APIS.setdefault(oem, [])
+        api = idle.pop() if idle else None
+    if api is None:
+        if oem is None:
+            api = PyTessBaseAPI(lang='eng', psm=PSM.AUTO)
+        else:
+            api = PyTessBaseAPI(lang='eng', psm=PSM.AUTO, oem=oem)
+    api.SetPageSegMode(PSM.AUTO if psm is None else psm)
+    try:
+        yield api
+    finally:
+        with _TESS_APIS_LOCK:
+            idle.append(api)
+
+
+# Median word height (pixels at scale 1) above which a 1x render OCRs as well as 2x
+_OCR_LARGE_TEXT_PX = 20
+
+
+def _ocr_render_scale(att: Attachment, pdf_doc, page_nums: list, pytesseract) -> float:
+    """
+    Pick the render scale for OCR: [ocr_scale:N] if given, else 2.
+    
+    For documents of three or more pages, the first page is probed at
+    scale 1 first. If its median word height shows large type, scale 1 is
+    used for the whole document, since tesseract's time grows with pixel
+    count. With tesserocr the probe is layout analysis only, without
+    recognition.
+    """
+    if 'ocr_scale' in att.commands:
+        return float(att.commands['ocr_scale'])
+    if len(page_nums) < 3:
+        return 2
+    
+    _, probe, error = next(_render_pdf_pages(pdf_doc, page_nums[:1], scale=1, grayscale=True))
+    if error is not None:
+        return 2
+    
+    try:
+        if pytesseract is None:
+            from tesserocr import RIL
+            with _pooled_tess_api() as api:
+                api.SetImage(probe)
+                heights = [box['h'] for _, box, _, _ in api.GetComponentImages(RIL.WORD, True)]
+        else:
+            data = pytesseract.image_to_data(probe, lang='eng', output_type=pytesseract.Output.DICT)
+            heights = [h for level, h, word in zip(data['level'], data['height'], data['text'])
+                       if level == 5 and word.strip()]
+    except Exception:
+        return 2
+    
+    if not heights:
+        return 2
+    heights.sort()
+    return 1 if heights[len(heights) // 2] > _OCR_LARGE_TEXT_PX else 2
+
+
+def _tesserocr_page(page_num: int, image, psm=None, oem=None) -> tuple:
+    """
+    OCR one rendered page in-process with a pooled tesserocr API instance.
+    
+    image is a PIL image or a raw (pixels, width, height, bytes_per_pixel,
+    stride) tuple from _render_pdf_pages(raw=True), which Tesseract takes
+    without a PIL conversion.
+    """
+    try:
+        with _pooled_tess_api(psm, oem) as api:
+            if isinstance(image, tuple):
+                api.SetImageBytes(*image)
+            else:
+                api.SetImage(image)
+            page_text = api.GetUTF8Text()
+    except RuntimeError as e:
+        return page_num, str(e), 'failed'
+    
+    return _ocr_row(page_num, page_text)
+
+
+def _ocr_row(page_num: int, page_text: str) -> tuple:
+    page_text = page_text.strip()
+    return page_num, page_text, 'ok' if page_text else 'empty'
+
+
+def _ocr_batch(pytesseract, batch: list, work_dir: str, pending_writes=(), config: str = '') -> list:
+    """
+    OCR (page_num, png_path) pairs with a single tesseract run over a list file.
+    
+    Waits for pending_writes (the futures saving the PNGs) first. Tesseract
+    ends each page's text with a form feed. If the run fails or the page
+    count doesn't line up, the batch is redone page by page so errors stay
+    attributed to the right page.
+    """
+    for write in pending_writes:
+        write.result()
+    
+    if len(batch) > 1:
+        list_path = os.path.join(work_dir, f"batch_{batch[0][0]}.txt")
+        with open(list_path, 'w', encoding='utf-8') as f:
+            f.write("".join(f"{png_path}\n" for _, png_path in batch))
+        try:
+            texts = pytesseract.image_to_string(list_path, lang='eng', config=config).split('\f')
+        except (pytesseract.TesseractError, OSError):
+            texts = []
+        if len(texts) in (len(batch), len(batch) + 1):
+            return [_ocr_row(page_num, text) for (page_num, _), text in zip(batch, texts)]
+    
+    return [_ocr_page(pytesseract, page_num, png_path, config) for page_num, png_path in batch]
+
+
+# Characters of embedded text above which a page is taken as-is instead of OCR'd
+_NATIVE_TEXT_MIN_CHARS = 50
+
+
+def _pdfium_page_text(pdf_doc, page_idx: int) -> str:
+    """Text layer of a 0-based page via pdfium's text page; caller holds _PDFIUM_LOCK."""
+    page = pdf_doc[page_idx]
+    try:
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range()
+        finally:
+            textpage.close()
+    finally:
+        page.close()
+
+
+def _native_page_texts(att: Attachment, pdf_reader, pdf_doc, page_nums) -> dict:
+    """
+    {page_num: text} for pages whose embedded text layer makes OCR unnecessary.
+    
+    Reuses text the markdown/text presenters already pulled out with
+    pdfplumber; other pages are read through pdfium's text page, which is
+    far cheaper than rendering plus tesseract.
+    """
+    cache = att._page_text_cache
+    known = cache['pages'] if cache and cache['obj'] is pdf_reader else {}
+    
+    texts = {}
+    for page_num in page_nums:
+        text = known.get(page_num)
+        if text is None:
+            try:
+                with _PDFIUM_LOCK:
+                    text = _pdfium_page_text(pdf_doc, page_num - 1)
+            except Exception:
+                continue
+        text = text.strip()
+        if len(text) > _NATIVE_TEXT_MIN_CHARS:
+            texts[page_num] = text
+    return texts
+
+
+def _render_pdf_pages(pdf_doc, page_nums, raw=False, **render_kwargs):
+    """
+    Render 1-based pages of a pypdfium2 document one after another.
+    
+    Yields (page_num, image, error). Each page and its bitmap are closed
+    as soon as the pixels are copied out, so only one page is held at a
+    time and nothing pdfium-owned reaches other threads.
+    With raw=True, single-channel bitmaps are yielded as a (pixels, width,
+    height, bytes_per_pixel, stride) tuple instead of a PIL image.
+    """
+    for page_num in page_nums:
+        try:
+            with _PDFIUM_LOCK:
+                page = pdf_doc[page_num - 1]
+                try:
+                    bitmap = page.render(**render_kwargs)
+                    try:
+                        # Copy the pixels out so the bitmap is destroyed here, under the
+                        # lock, and no image handed to OCR workers still references it
+                        if raw and getattr(bitmap, 'n_channels', None) == 1:
+                            image = (bytes(bitmap.buffer), bitmap.width, bitmap.height, 1, bitmap.stride)
+                        else:
+                            image = bitmap.to_pil().copy()
+                    finally:
+                        bitmap.close()
+                finally:
+                    page.close()
+        except Exception as e:
+            yield page_num, None, e
+            continue
+        yield page_num, image, None
+
+
+def _format_ocr_page(page_num: int, page_text: str, status: str) -> str:
+    """Format one OCR result row as a markdown section."""
+    if status == 'native':
+        return f"### Page {page_num} (text layer)\n\n{page_text}\n\n"
+    if status == 'ok':
+        body = page_text
+    elif status == 'empty':
+        body = "*[No text detected by OCR]*"
+    else:
+        body = f"*[OCR failed: {page_text}]*"
+    return f"### Page {page_num} (OCR)\n\n{body}\n\n"
 
 
 @presenter
 def text(att: Attachment, pres: 'pptx.Presentation') -> Attachment:
     """Extract plain text from PowerPoint slides."""
-    att.text += f"Presentation: {att.path}\n"
-    att.text += "=" * len(f"Presentation: {att.path}") + "\n\n"
+    header = f"Presentation: {att.path}"
+    parts = [header, "\n", "=" * len(header), "\n\n"]
     
     try:
-        slide_indices = att.metadata.get('selected_slides', range(len(pres.slides)))
+        slides = list(pres.slides)
+        n_slides = len(slides)
+        slide_indices = att.metadata.get('selected_slides', range(n_slides))
         
         for i, slide_idx in enumerate(slide_indices):
-            if 0 <= slide_idx < len(pres.slides):
-                slide = pres.slides[slide_idx]
-                att.text += f"[Slide {slide_idx + 1}]\n"
+            if 0 <= slide_idx < n_slides:
+                slide = slides[slide_idx]
+                parts.append(f"[Slide {slide_idx + 1}]\n")
                 
-                slide_text = ""
-                for shape in slide.shapes:
-                    if hasattr(shape, 'text') and shape.text.strip():
-                        slide_text += f"{shape.text}\n"
+                slide_text = ''.join(f"{t}\n" for t in _slide_texts(att, pres, slide_idx, slide))
                 
                 if slide_text.strip():
-                    att.text += f"{slide_text}\n"
+                    parts.append(f"{slide_text}\n")
                 else:
-                    att.text += "[No text content]\n\n"
+                    parts.append("[No text content]\n\n")
         
-        att.text += f"Slides processed: {len(slide_indices)}\n\n"
+        parts.append(f"Slides processed: {len(slide_indices)}\n\n")
     except Exception as e:
-        att.text += f"Error extracting slides: {e}\n\n"
+        parts.append(f"Error extracting slides: {e}\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
 @presenter
 def xml(att: Attachment, pres: 'pptx.Presentation') -> Attachment:
     """Extract raw PPTX XML content for detailed analysis."""
-    att.text += f"# PPTX XML Content: {att.path}\n\n"
+    parts = [f"# PPTX XML Content: {att.path}\n\n"]
     
     try:
         import zipfile
-        import xml.dom.minidom
+        from lxml import etree
         
         # PPTX files are ZIP archives containing XML
         with zipfile.ZipFile(att.path, 'r') as pptx_zip:
             # Get slide indices to process
             slide_indices = att.metadata.get('selected_slides', range(min(3, len(pres.slides))))
             
-            att.text += "```xml\n"
-            att.text += "<!-- PPTX Structure Overview -->\n"
+            parts.append("```xml\n")
+            parts.append("<!-- PPTX Structure Overview -->\n")
             
             # List all XML files in the PPTX
-            xml_files = [f for f in pptx_zip.namelist() if f.endswith('.xml')]
-            att.text += f"<!-- XML Files: {', '.join(xml_files[:10])}{'...' if len(xml_files) > 10 else ''} -->\n\n"
+            # Read the central directory once; the set serves the membership checks below
+            entry_names = pptx_zip.namelist()
+            names = set(entry_names)
+            xml_files = [f for f in entry_names if f.endswith('.xml')]
+            parts.append(f"<!-- XML Files: {', '.join(xml_files[:10])}{'...' if len(xml_files) > 10 else ''} -->\n\n")
             
-            # Extract slide XML content
+            # Extract slide XML content from the already-parsed slide trees
             for slide_idx in slide_indices:
-                slide_xml_path = f"ppt/slides/slide{slide_idx + 1}.xml"
-                
-                if slide_xml_path in pptx_zip.namelist():
+                if 0 <= slide_idx < len(pres.slides):
                     try:
-                        xml_content = pptx_zip.read(slide_xml_path).decode('utf-8')
-                        
-                        # Pretty print the XML
-                        dom = xml.dom.minidom.parseString(xml_content)
-                        pretty_xml = dom.toprettyxml(indent="  ")
-                        
-                        # Remove empty lines and XML declaration for cleaner output
-                        lines = [line for line in pretty_xml.split('\n') if line.strip()]
-                        if lines and lines[0].startswith('<?xml'):
-                            lines = lines[1:]  # Remove XML declaration
-                        
-                        att.text += f"<!-- Slide {slide_idx + 1} XML -->\n"
-                        att.text += '\n'.join(lines[:50])  # Limit to first 50 lines per slide
-                        if len(lines) > 50:
-                            att.text += f"\n<!-- ... truncated ({len(lines) - 50} more lines) -->\n"
-                        att.text += "\n\n"
-                        
-                    except Exception as e:
-                        att.text += f"<!-- Error parsing slide {slide_idx + 1} XML: {e} -->\n\n"
+                        # Limit to first 50 lines per slide
+                        lines, more = _element_xml_lines(pres.slides[slide_idx].element, 50)
+                    except etree.LxmlError as e:
+                        parts.append(f"<!-- Error parsing slide {slide_idx + 1} XML: {e} -->\n\n")
+                        continue
+                    
+                    parts.append(f"<!-- Slide {slide_idx + 1} XML -->\n")
+                    parts.append('\n'.join(lines))
+                    if more:
+                        parts.append(f"\n<!-- ... truncated ({more} more lines) -->\n")
+                    parts.append("\n\n")
                 else:
-                    att.text += f"<!-- Slide {slide_idx + 1} XML not found -->\n\n"
+                    parts.append(f"<!-- Slide {slide_idx + 1} XML not found -->\n\n")
             
             # Also include presentation.xml for overall structure
-            if "ppt/presentation.xml" in pptx_zip.namelist():
+            if "ppt/presentation.xml" in names:
                 try:
-                    pres_xml = pptx_zip.read("ppt/presentation.xml").decode('utf-8')
-                    dom = xml.dom.minidom.parseString(pres_xml)
-                    pretty_xml = dom.toprettyxml(indent="  ")
-                    lines = [line for line in pretty_xml.split('\n') if line.strip()]
-                    if lines and lines[0].startswith('<?xml'):
-                        lines = lines[1:]
+                    lines, truncated = _zip_xml_head_lines(pptx_zip, "ppt/presentation.xml", 30)  # Limit presentation XML
                     
-                    att.text += "<!-- Presentation Structure XML -->\n"
-                    att.text += '\n'.join(lines[:30])  # Limit presentation XML
-                    if len(lines) > 30:
-                        att.text += f"\n<!-- ... truncated ({len(lines) - 30} more lines) -->\n"
+                    parts.append("<!-- Presentation Structure XML -->\n")
+                    parts.append('\n'.join(lines))
+                    if truncated:
+                        parts.append("\n<!-- ... truncated -->\n")
                     
                 except Exception as e:
-                    att.text += f"<!-- Error parsing presentation XML: {e} -->\n"
+                    parts.append(f"<!-- Error parsing presentation XML: {e} -->\n")
             
-            att.text += "```\n\n"
-            att.text += f"*XML content extracted from {len(slide_indices)} slides*\n\n"
+            parts.append("```\n\n")
+            parts.append(f"*XML content extracted from {len(slide_indices)} slides*\n\n")
             
     except Exception as e:
-        att.text += f"```\n<!-- Error extracting PPTX XML: {e} -->\n```\n\n"
+        parts.append(f"```\n<!-- Error extracting PPTX XML: {e} -->\n```\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
+
+def _zip_xml_head_lines(zf, name: str, max_lines: int = None) -> tuple:
+    """
+    Pretty-print the start of an XML entry in a ZIP archive, streaming it.
+    
+    Returns (lines, truncated). The entry is parsed incrementally from
+    zf.open() and parsing stops once max_lines lines exist, so only the
+    open element path is ever in memory; large parts like styles.xml are
+    never read, parsed or pretty-printed in full. Leaf elements print on
+    one line, containers get open/close lines, two spaces per level.
+    """
+    from xml.sax.saxutils import escape, quoteattr
+    try:
+        # libxml2's parser; same iterparse API as the stdlib fallback
+        from lxml.etree import iterparse
+    except ImportError:
+        from xml.etree.ElementTree import iterparse
+    
+    prefixes = {}
+    new_ns = []
+    lines = []
+    pending = None  # (element, depth, start tag) not yet known to be a leaf or a container
+    depth = 0
+    
+    def qname(tag):
+        if tag[:1] == '{':
+            uri, local = tag[1:].split('}', 1)
+            prefix = prefixes.get(uri)
+            return f"{prefix}:{local}" if prefix else local
+        return tag
+    
+    with zf.open(name) as f:
+        for event, item in iterparse(f, events=('start-ns', 'start', 'end')):
+            if event == 'start-ns':
+                prefix, uri = item
+                prefixes.setdefault(uri, prefix)
+                new_ns.append(item)
+                continue
+            
+            if event == 'start':
+                if pending is not None:
+                    # The pending element has a child, so it is a container
+                    parent, parent_depth, tag = pending
+                    lines.append(f"{'  ' * parent_depth}{tag}>")
+                    text = (parent.text or '').strip()
+                    if text:
+                        lines.append(f"{'  ' * depth}{escape(text)}")
+                attrs = ''.join(f" xmlns{':' + p if p else ''}={quoteattr(uri)}" for p, uri in new_ns)
+                attrs += ''.join(f" {qname(k)}={quoteattr(v)}" for k, v in item.attrib.items())
+                new_ns = []
+                pending = (item, depth, f"<{qname(item.tag)}{attrs}")
+                depth += 1
+            else:
+                depth -= 1
+                if pending is not None and pending[0] is item:
+                    text = (item.text or '').strip()
+                    tag = pending[2]
+                    lines.append(f"{'  ' * depth}{tag}>{escape(text)}</{qname(item.tag)}>" if text
+                                 else f"{'  ' * depth}{tag}/>")
+                    pending = None
+                else:
+                    lines.append(f"{'  ' * depth}</{qname(item.tag)}>")
+                item.clear()
+            
+            if max_lines is not None and len(lines) >= max_lines:
+                return lines[:max_lines], True
+    
+    return lines, False
+
+
+def _element_xml_lines(element, max_lines: int) -> tuple:
+    """
+    Pretty-print an in-memory lxml element (as held by python-pptx/python-docx).
+    
+    Returns (first max_lines non-empty lines, number of non-empty lines left
+    out). Lines past the limit are only counted, never collected.
+    """
+    from itertools import islice
+    from lxml import etree
+    
+    pretty_xml = etree.tostring(element, pretty_print=True, encoding='unicode')
+    nonempty = (line for line in pretty_xml.splitlines() if line.strip())
+    head = list(islice(nonempty, max_lines))
+    return head, sum(1 for _ in nonempty)
+
+
 @presenter
 def text(att: Attachment, doc: 'docx.Document') -> Attachment:
     """Extract plain text from DOCX document."""
-    att.text += f"Document: {att.path}\n"
-    att.text += "=" * len(f"Document: {att.path}") + "\n\n"
+    header = f"Document: {att.path}"
+    parts = [header, "\n", "=" * len(header), "\n\n"]
     
     try:
+        paragraphs = _docx_paragraphs(doc)
+        
         # Extract text from all paragraphs
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                att.text += f"{paragraph.text}\n\n"
+        for style_id, paragraph_text in paragraphs:
+            if paragraph_text.strip():
+                parts.append(f"{paragraph_text}\n\n")
         
         # Add basic document info
-        att.text += f"*Document processed: {len(doc.paragraphs)} paragraphs*\n\n"
+        parts.append(f"*Document processed: {len(paragraphs)} paragraphs*\n\n")
         
     except Exception as e:
-        att.text += f"*Error extracting DOCX text: {e}*\n\n"
+        parts.append(f"*Error extracting DOCX text: {e}*\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
 @presenter
 def markdown(att: Attachment, doc: 'docx.Document') -> Attachment:
     """Convert DOCX document to markdown with basic formatting."""
-    att.text += f"# Document: {att.path}\n\n"
+    parts = [f"# Document: {att.path}\n\n"]
     
     try:
+        from docx.enum.style import WD_STYLE_TYPE
+        
+        paragraphs = _docx_paragraphs(doc)
+        
+        # Heading prefix ('' for body text) per style id; style lookups walk styles.xml
+        heading_prefixes = {}
+        
         # Extract text from all paragraphs with basic formatting
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                # Check if paragraph has heading style
-                if paragraph.style.name.startswith('Heading'):
-                    # Extract heading level from style name
-                    try:
-                        level = int(paragraph.style.name.split()[-1])
-                        heading_prefix = "#" * min(level + 1, 6)  # Limit to h6
-                        att.text += f"{heading_prefix} {paragraph.text}\n\n"
-                    except:
-                        # If we can't parse the heading level, treat as h2
-                        att.text += f"## {paragraph.text}\n\n"
-                else:
-                    # Regular paragraph
-                    att.text += f"{paragraph.text}\n\n"
+        for style_id, paragraph_text in paragraphs:
+            if paragraph_text.strip():
+                heading_prefix = heading_prefixes.get(style_id)
+                if heading_prefix is None:
+                    # Check if paragraph has heading style
+                    style_name = doc.part.get_style(style_id, WD_STYLE_TYPE.PARAGRAPH).name
+                    if style_name.startswith('Heading'):
+                        # Extract heading level from style name; unparseable levels become h2
+                        match = _HEADING_RE.match(style_name)
+                        heading_prefix = "#" * min(int(match.group(1)) + 1, 6) + " " if match else "## "  # Limit to h6
+                    else:
+                        # Regular paragraph
+                        heading_prefix = ""
+                    heading_prefixes[style_id] = heading_prefix
+                
+                parts.append(f"{heading_prefix}{paragraph_text}\n\n")
         
         # Add document metadata
-        att.text += f"*Document processed: {len(doc.paragraphs)} paragraphs*\n\n"
+        parts.append(f"*Document processed: {len(paragraphs)} paragraphs*\n\n")
         
     except Exception as e:
-        att.text += f"*Error extracting DOCX content: {e}*\n\n"
+        parts.append(f"*Error extracting DOCX content: {e}*\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
+# "Heading 2" / "Heading2" -> level 2
+_HEADING_RE = re.compile(r'Heading\s*(\d+)\s*$')
+
+
+def _docx_paragraphs(doc) -> list:
+    """
+    Return (style_id, text) for each body paragraph of a python-docx Document.
+    
+    Walks the lxml tree with XPath instead of building python-docx Paragraph
+    proxies; mirrors doc.paragraphs (direct body children) and Paragraph.text.
+    """
+    from docx.oxml.ns import qn
+    
+    w_t, w_tab, w_cr = qn('w:t'), qn('w:tab'), qn('w:cr')
+    w_type = qn('w:type')
+    
+    rows = []
+    for p in doc.element.body.xpath('./w:p'):
+        style_ids = p.xpath('./w:pPr/w:pStyle/@w:val')
+        pieces = []
+        for el in p.xpath('./w:r/*[self::w:t or self::w:tab or self::w:br or self::w:cr]'
+                          ' | ./w:hyperlink/w:r/*[self::w:t or self::w:tab or self::w:br or self::w:cr]'):
+            tag = el.tag
+            if tag == w_t:
+                pieces.append(el.text or '')
+            elif tag == w_tab:
+                pieces.append('\t')
+            elif tag == w_cr or el.get(w_type, 'textWrapping') == 'textWrapping':
+                pieces.append('\n')
+        rows.append((style_ids[0] if style_ids else None, ''.join(pieces)))
+    return rows
+
+
 @presenter
 def xml(att: Attachment, doc: 'docx.Document') -> Attachment:
     """Extract raw DOCX XML content for detailed analysis."""
-    att.text += f"# DOCX XML Content: {att.path}\n\n"
+    parts = [f"# DOCX XML Content: {att.path}\n\n"]
     
     try:
         import zipfile
-        import xml.dom.minidom
         
         # DOCX files are ZIP archives containing XML
         with zipfile.ZipFile(att.path, 'r') as docx_zip:
-            att.text += "```xml\n"
-            att.text += "<!-- DOCX Structure Overview -->\n"
+            parts.append("```xml\n")
+            parts.append("<!-- DOCX Structure Overview -->\n")
             
             # List all XML files in the DOCX
-            xml_files = [f for f in docx_zip.namelist() if f.endswith('.xml')]
-            att.text += f"<!-- XML Files: {', '.join(xml_files[:10])}{'...' if len(xml_files) > 10 else ''} -->\n\n"
+            # Read the central directory once; the set serves the membership checks below
+            entry_names = docx_zip.namelist()
+            names = set(entry_names)
+            xml_files = [f for f in entry_names if f.endswith('.xml')]
+            parts.append(f"<!-- XML Files: {', '.join(xml_files[:10])}{'...' if len(xml_files) > 10 else ''} -->\n\n")
             
-            # Extract main document XML content
-            if "word/document.xml" in docx_zip.namelist():
-                try:
-                    xml_content = docx_zip.read("word/document.xml").decode('utf-8')
-                    
-                    # Pretty print the XML
-                    dom = xml.dom.minidom.parseString(xml_content)
-                    pretty_xml = dom.toprettyxml(indent="  ")
-                    
-                    # Remove empty lines and XML declaration for cleaner output
-                    lines = [line for line in pretty_xml.split('\n') if line.strip()]
-                    if lines and lines[0].startswith('<?xml'):
-                        lines = lines[1:]  # Remove XML declaration
-                    
-                    att.text += f"<!-- Main Document XML -->\n"
-                    att.text += '\n'.join(lines[:100])  # Limit to first 100 lines
-                    if len(lines) > 100:
-                        att.text += f"\n<!-- ... truncated ({len(lines) - 100} more lines) -->\n"
-                    att.text += "\n\n"
-                    
-                except Exception as e:
-                    att.text += f"<!-- Error parsing document XML: {e} -->\n\n"
+            # Extract main document XML content from the already-parsed tree
+            try:
+                lines, more = _element_xml_lines(doc.element, 100)  # Limit to first 100 lines
+                
+                parts.append(f"<!-- Main Document XML -->\n")
+                parts.append('\n'.join(lines))
+                if more:
+                    parts.append(f"\n<!-- ... truncated ({more} more lines) -->\n")
+                parts.append("\n\n")
+                
+            except Exception as e:
+                parts.append(f"<!-- Error parsing document XML: {e} -->\n\n")
             
             # Also include styles.xml for formatting information
-            if "word/styles.xml" in docx_zip.namelist():
+            if "word/styles.xml" in names:
                 try:
-                    styles_xml = docx_zip.read("word/styles.xml").decode('utf-8')
-                    dom = xml.dom.minidom.parseString(styles_xml)
-                    pretty_xml = dom.toprettyxml(indent="  ")
-                    lines = [line for line in pretty_xml.split('\n') if line.strip()]
-                    if lines and lines[0].startswith('<?xml'):
-                        lines = lines[1:]
+                    lines, truncated = _zip_xml_head_lines(docx_zip, "word/styles.xml", 50)  # Limit styles XML
                     
-                    att.text += "<!-- Styles XML -->\n"
-                    att.text += '\n'.join(lines[:50])  # Limit styles XML
-                    if len(lines) > 50:
-                        att.text += f"\n<!-- ... truncated ({len(lines) - 50} more lines) -->\n"
+                    parts.append("<!-- Styles XML -->\n")
+                    parts.append('\n'.join(lines))
+                    if truncated:
+                        parts.append("\n<!-- ... truncated -->\n")
                     
                 except Exception as e:
-                    att.text += f"<!-- Error parsing styles XML: {e} -->\n"
+                    parts.append(f"<!-- Error parsing styles XML: {e} -->\n")
             
             # Include document properties if available
-            if "docProps/core.xml" in docx_zip.namelist():
+            if "docProps/core.xml" in names:
                 try:
-                    props_xml = docx_zip.read("docProps/core.xml").decode('utf-8')
-                    dom = xml.dom.minidom.parseString(props_xml)
-                    pretty_xml = dom.toprettyxml(indent="  ")
-                    lines = [line for line in pretty_xml.split('\n') if line.strip()]
-                    if lines and lines[0].startswith('<?xml'):
-                        lines = lines[1:]
+                    lines, _ = _zip_xml_head_lines(docx_zip, "docProps/core.xml")
                     
-                    att.text += "\n\n<!-- Document Properties XML -->\n"
-                    att.text += '\n'.join(lines)
+                    parts.append("\n\n<!-- Document Properties XML -->\n")
+                    parts.append('\n'.join(lines))
                     
                 except Exception as e:
-                    att.text += f"\n<!-- Error parsing properties XML: {e} -->\n"
+                    parts.append(f"\n<!-- Error parsing properties XML: {e} -->\n")
             
-            att.text += "```\n\n"
-            att.text += f"*XML content extracted from DOCX structure*\n\n"
+            parts.append("```\n\n")
+            parts.append(f"*XML content extracted from DOCX structure*\n\n")
             
     except Exception as e:
-        att.text += f"```\n<!-- Error extracting DOCX XML: {e} -->\n```\n\n"
+        parts.append(f"```\n<!-- Error extracting DOCX XML: {e} -->\n```\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
 @presenter
 def text(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
     """Extract plain text summary from Excel workbook."""
-    att.text += f"Workbook: {att.path}\n"
-    att.text += "=" * len(f"Workbook: {att.path}") + "\n\n"
+    header = f"Workbook: {att.path}"
+    parts = [header, "\n", "=" * len(header), "\n\n"]
     
     try:
         # Get selected sheets (respects pages DSL command for sheet selection)
@@ -1212,39 +2439,45 @@ def text(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
         for i, sheet_idx in enumerate(sheet_indices):
             if 0 <= sheet_idx < len(workbook.worksheets):
                 sheet = workbook.worksheets[sheet_idx]
-                att.text += f"[Sheet {sheet_idx + 1}: {sheet.title}]\n"
+                parts.append(f"[Sheet {sheet_idx + 1}: {sheet.title}]\n")
                 
                 # Get sheet dimensions
                 max_row = sheet.max_row
                 max_col = sheet.max_column
-                att.text += f"Dimensions: {max_row} rows × {max_col} columns\n"
+                parts.append(f"Dimensions: {max_row} rows × {max_col} columns\n")
                 
                 # Show first few rows as preview
+                # values_only rows avoid building a Cell per value (and, in read-only
+                # mode, re-scanning the sheet XML for every sheet.cell() lookup)
                 preview_rows = min(5, max_row)
-                for row_idx in range(1, preview_rows + 1):
-                    row_data = []
-                    for col_idx in range(1, min(6, max_col + 1)):  # First 5 columns
-                        cell = sheet.cell(row=row_idx, column=col_idx)
-                        value = str(cell.value) if cell.value is not None else ""
-                        row_data.append(value[:20])  # Truncate long values
-                    att.text += f"Row {row_idx}: {' | '.join(row_data)}\n"
+                rows = sheet.iter_rows(min_row=1, max_row=preview_rows,
+                                       max_col=max(1, min(5, max_col)),  # First 5 columns
+                                       values_only=True) if preview_rows > 0 else ()
+                for row_idx, row in enumerate(rows, start=1):
+                    row_data = ["" if value is None else str(value)[:20] for value in row]  # Truncate long values
+                    parts.append(f"Row {row_idx}: {' | '.join(row_data)}\n")
                 
                 if max_row > preview_rows:
-                    att.text += f"... ({max_row - preview_rows} more rows)\n"
-                att.text += "\n"
+                    parts.append(f"... ({max_row - preview_rows} more rows)\n")
+                parts.append("\n")
         
-        att.text += f"*Workbook processed: {len(sheet_indices)} sheets*\n\n"
+        parts.append(f"*Workbook processed: {len(sheet_indices)} sheets*\n\n")
         
     except Exception as e:
-        att.text += f"*Error extracting Excel content: {e}*\n\n"
+        parts.append(f"*Error extracting Excel content: {e}*\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
+# Escapes pipes and flattens newlines in markdown table cells in one pass
+_MD_CELL_TRANS = str.maketrans({'|': '\\|', '\n': ' '})
+
+
 @presenter
 def markdown(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
     """Convert Excel workbook to markdown with sheet summaries and basic table previews."""
-    att.text += f"# Workbook: {att.path}\n\n"
+    parts = [f"# Workbook: {att.path}\n\n"]
     
     try:
         # Get selected sheets (respects pages DSL command for sheet selection)
@@ -1253,55 +2486,53 @@ def markdown(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
         for i, sheet_idx in enumerate(sheet_indices):
             if 0 <= sheet_idx < len(workbook.worksheets):
                 sheet = workbook.worksheets[sheet_idx]
-                att.text += f"## Sheet {sheet_idx + 1}: {sheet.title}\n\n"
+                parts.append(f"## Sheet {sheet_idx + 1}: {sheet.title}\n\n")
                 
                 # Get sheet dimensions
                 max_row = sheet.max_row
                 max_col = sheet.max_column
-                att.text += f"**Dimensions**: {max_row} rows × {max_col} columns\n\n"
+                parts.append(f"**Dimensions**: {max_row} rows × {max_col} columns\n\n")
                 
                 # Create a markdown table preview (first 5 rows, first 5 columns)
                 preview_rows = min(6, max_row + 1)  # +1 to include header
                 preview_cols = min(5, max_col)
                 
                 if max_row > 0 and max_col > 0:
-                    att.text += "**Preview**:\n\n"
+                    parts.append("**Preview**:\n\n")
                     
                     # Build markdown table
-                    table_rows = []
-                    for row_idx in range(1, preview_rows):
-                        row_data = []
-                        for col_idx in range(1, preview_cols + 1):
-                            cell = sheet.cell(row=row_idx, column=col_idx)
-                            value = str(cell.value) if cell.value is not None else ""
-                            # Clean value for markdown table
-                            value = value.replace("|", "\\|").replace("\n", " ")[:30]
-                            row_data.append(value)
-                        table_rows.append(row_data)
+                    table_rows = [
+                        # Clean values for markdown table
+                        ["" if value is None else str(value).translate(_MD_CELL_TRANS)[:30]
+                         for value in row]
+                        for row in sheet.iter_rows(min_row=1, max_row=preview_rows - 1,
+                                                   max_col=preview_cols, values_only=True)
+                    ]
                     
                     if table_rows:
                         # Create markdown table
                         header = table_rows[0] if table_rows else ["Col1", "Col2", "Col3", "Col4", "Col5"]
-                        att.text += "| " + " | ".join(header[:preview_cols]) + " |\n"
-                        att.text += "|" + "---|" * preview_cols + "\n"
+                        parts.append("| " + " | ".join(header[:preview_cols]) + " |\n")
+                        parts.append("|" + "---|" * preview_cols + "\n")
                         
                         for row in table_rows[1:]:
-                            att.text += "| " + " | ".join(row[:preview_cols]) + " |\n"
+                            parts.append("| " + " | ".join(row[:preview_cols]) + " |\n")
                         
                         if max_row > preview_rows - 1:
-                            att.text += f"\n*... and {max_row - (preview_rows - 1)} more rows*\n"
+                            parts.append(f"\n*... and {max_row - (preview_rows - 1)} more rows*\n")
                         if max_col > preview_cols:
-                            att.text += f"*... and {max_col - preview_cols} more columns*\n"
+                            parts.append(f"*... and {max_col - preview_cols} more columns*\n")
                     
-                    att.text += "\n"
+                    parts.append("\n")
                 else:
-                    att.text += "*Empty sheet*\n\n"
+                    parts.append("*Empty sheet*\n\n")
         
-        att.text += f"*Workbook processed: {len(sheet_indices)} sheets*\n\n"
+        parts.append(f"*Workbook processed: {len(sheet_indices)} sheets*\n\n")
         
     except Exception as e:
-        att.text += f"*Error extracting Excel content: {e}*\n\n"
+        parts.append(f"*Error extracting Excel content: {e}*\n\n")
     
+    att.text += "".join(parts)
     return att
 
 
@@ -1309,71 +2540,66 @@ def markdown(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
 def images(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
     """Convert Excel sheets to PNG images by converting to PDF first, then rendering.
     
+    The PDF conversion is cached by content hash like PPTX/DOCX. With
+    [fast_preview:true] LibreOffice is skipped entirely and the top-left
+    corner of each sheet's values is drawn as a plain grid instead.
+    
     Future improvements:
     - Direct Excel-to-image conversion using xlwings or similar
     - Better handling of large sheets with automatic scaling
     - Support for chart extraction
     - Custom sheet selection and formatting options
     """
-    try:
-        # Try to import required libraries
-        import pypdfium2 as pdfium
-        import subprocess
-        import shutil
-        import tempfile
-        import os
-        from pathlib import Path
-        import base64
-        import io
-    except ImportError as e:
-        att.metadata['excel_images_error'] = f"Required libraries not installed: {e}. Install with: pip install pypdfium2"
-        return att
-    
     # Get resize parameter from DSL commands
     resize = att.commands.get('resize_images')
     
+    if att.commands.get('fast_preview', 'false').lower() == 'true':
+        try:
+            images = []
+            worksheets = workbook.worksheets
+            sheet_indices = att.metadata.get('selected_sheets', range(len(worksheets)))
+            for sheet_idx in list(sheet_indices)[:20]:
+                if 0 <= sheet_idx < len(worksheets):
+                    pil_image = _apply_resize(_excel_preview_image(worksheets[sheet_idx]), resize)
+                    buf = _encode_buffer()
+                    pil_image.save(buf, format='PNG', optimize=False, compress_level=1)
+                    images.append("data:image/png;base64," + _buffer_b64(buf).decode('ascii'))
+            
+            att.images.extend(images)
+            att.metadata.update({
+                'excel_sheets_rendered': len(images),
+                'excel_total_sheets': len(worksheets),
+                'excel_resize_applied': resize if resize else None,
+                'excel_conversion_method': 'openpyxl_preview'
+            })
+        except Exception as e:
+            att.metadata['excel_images_error'] = f"Error rendering Excel preview: {e}"
+        return att
+    
+    if _pdfium is None:
+        att.metadata['excel_images_error'] = "pypdfium2 not installed. Install with: pip install pypdfium2"
+        return att
+    
+    # Get encoding parameters from DSL commands (PNG unless [image_format:jpeg])
+    image_format = att.commands.get('image_format', 'png')
+    image_quality = int(att.commands.get('image_quality', 85))
+    
     images = []
     
     try:
-        # Convert Excel to PDF first (using LibreOffice/soffice)
-        def convert_excel_to_pdf(excel_path: str) -> str:
-            """Convert Excel to PDF using LibreOffice/soffice."""
-            # Try to find LibreOffice or soffice
-            soffice = shutil.which("libreoffice") or shutil.which("soffice")
-            if not soffice:
-                raise RuntimeError("LibreOffice/soffice not found. Install LibreOffice to convert Excel to PDF.")
-            
-            # Create temporary directory for PDF output
-            temp_dir = tempfile.mkdtemp()
-            excel_path_obj = Path(excel_path)
-            
-            # Run LibreOffice conversion
-            subprocess.run(
-                [soffice, "--headless", "--convert-to", "pdf", "--outdir", temp_dir, str(excel_path_obj)],
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                timeout=60  # 60 second timeout
-            )
-            
-            # Find the generated PDF
-            pdf_path = Path(temp_dir) / (excel_path_obj.stem + ".pdf")
-            if not pdf_path.exists():
-                raise RuntimeError(f"PDF conversion failed - output file not found: {pdf_path}")
-            
-            return str(pdf_path)
-        
         # Convert Excel to PDF
         if not att.path:
             raise RuntimeError("No file path available for Excel conversion")
         
-        pdf_path = convert_excel_to_pdf(att.path)
+        # Cached by content hash, so re-presenting the same file skips LibreOffice
+        pdf_path = _cached_soffice_convert(att.path, 'xlsx2pdf')
         
-        try:
-            # Open the PDF with pypdfium2
-            pdf_doc = pdfium.PdfDocument(pdf_path)
+        # Open the PDF with pypdfium2
+        with _PDFIUM_LOCK:
+            pdf_doc = _pdfium.PdfDocument(pdf_path)
             num_pages = len(pdf_doc)
-            
+        
+        try:
             # Get selected sheets (respects pages DSL command, treating pages as sheets)
             sheet_indices = att.metadata.get('selected_sheets', range(num_pages))
             
@@ -1387,45 +2613,14 @@ def images(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
             max_sheets = min(num_pages, 20)
             page_indices = page_indices[:max_sheets]
             
-            for page_idx in page_indices:
-                if 0 <= page_idx < num_pages:
-                    page = pdf_doc[page_idx]
-                    
-                    # Render at 2x scale for better quality (like PDF processor)
-                    pil_image = page.render(scale=2).to_pil()
-                    
-                    # Apply resize if specified
-                    if resize:
-                        if 'x' in resize:
-                            # Format: 800x600
-                            w, h = map(int, resize.split('x'))
-                            pil_image = pil_image.resize((w, h), pil_image.Resampling.LANCZOS)
-                        elif resize.endswith('%'):
-                            # Format: 50%
-                            scale = int(resize[:-1]) / 100
-                            new_width = int(pil_image.width * scale)
-                            new_height = int(pil_image.height * scale)
-                            pil_image = pil_image.resize((new_width, new_height), pil_image.Resampling.LANCZOS)
-                    
-                    # Convert to PNG bytes
-                    img_byte_arr = io.BytesIO()
-                    pil_image.save(img_byte_arr, format='PNG')
-                    png_bytes = img_byte_arr.getvalue()
-                    
-                    # Encode as base64 data URL (consistent with PDF processor)
-                    b64_string = base64.b64encode(png_bytes).decode('utf-8')
-                    images.append(f"data:image/png;base64,{b64_string}")
-            
-            # Clean up PDF document
-            pdf_doc.close()
+            # Resizing and encoding overlap with rendering of the next sheet
+            images = _render_pdf_images(pdf_doc, page_indices, resize,
+                                        image_format=image_format, quality=image_quality)
             
         finally:
-            # Clean up temporary PDF file
-            try:
-                os.unlink(pdf_path)
-                os.rmdir(os.path.dirname(pdf_path))
-            except:
-                pass  # Ignore cleanup errors
+            # Clean up PDF document (the converted PDF itself stays in the cache)
+            with _PDFIUM_LOCK:
+                pdf_doc.close()
         
         # Add images to attachment
         att.images.extend(images)
@@ -1452,283 +2647,604 @@ def images(att: Attachment, workbook: 'openpyxl.Workbook') -> Attachment:
         return att
 
 
-@presenter
-def images(att: Attachment, soup: 'bs4.BeautifulSoup') -> Attachment:
-    """Capture webpage screenshot using Playwright with JavaScript rendering and CSS selector highlighting.
+def _excel_preview_image(sheet, max_rows: int = 30, max_cols: int = 10) -> 'PIL.Image.Image':
+    """Draw the top-left corner of a sheet's cell values as a simple grid, without LibreOffice."""
+    from PIL import Image, ImageDraw, ImageFont
+    
+    rows = [["" if value is None else str(value)[:30] for value in row]
+            for row in sheet.iter_rows(min_row=1, max_row=max_rows, max_col=max_cols, values_only=True)]
+    n_cols = max((len(row) for row in rows), default=0)
+    
+    font = ImageFont.load_default()
+    pad, row_height = 4, 16
+    col_widths = [
+        max([int(font.getlength(row[c])) for row in rows if c < len(row)] + [20]) + 2 * pad
+        for c in range(n_cols)
+    ]
+    
+    img = Image.new('RGB', (sum(col_widths) + 1, len(rows) * row_height + 1), 'white')
+    draw = ImageDraw.Draw(img)
+    for r, row in enumerate(rows):
+        y = r * row_height
+        x = 0
+        for c, width in enumerate(col_widths):
+            # Shade the first row, which is usually the header
+            draw.rectangle([x, y, x + width, y + row_height], outline=(200, 200, 200),
+                           fill=(235, 235, 235) if r == 0 else None)
+            if c < len(row):
+                draw.text((x + pad, y + 2), row[c], fill='black', font=font)
+            x += width
+    return img
+
+
+# Persistent event loop in a daemon thread for the async Playwright code. Async
+# objects are bound to the loop that created them, so the browser pool must live
+# on one loop that outlives each call; callers block on the result from any
+# thread, including inside Jupyter's own running loop.
+_ASYNC_LOOP = None
+_ASYNC_LOOP_LOCK = threading.Lock()
+
+
+def _run_async(coro, timeout=None):
+    """Run a coroutine on the shared background loop and return its result."""
+    import asyncio
+    import concurrent.futures
+    global _ASYNC_LOOP
+    
+    with _ASYNC_LOOP_LOCK:
+        if _ASYNC_LOOP is None:
+            _ASYNC_LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_ASYNC_LOOP.run_forever, name='attachments-async',
+                             daemon=True).start()
+    future = asyncio.run_coroutine_threadsafe(coro, _ASYNC_LOOP)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise
+
+
+class _BrowserPool:
+    """
+    Long-lived headless Chromium instances shared by webpage screenshots.
     
-    Supports DSL commands:
-    - viewport: 1280x720 for browser viewport size (default: 1280x720)
-    - fullpage: true|false for full page vs viewport screenshot (default: true)
-    - wait: 2000 for page settling time in milliseconds (default: 200)
-    - select: CSS selector to highlight elements in the screenshot
+    Launching a browser costs seconds, so browsers are kept and each
+    capture only opens a page. A capture holds one of POOL_SIZE slots while
+    it runs; it takes an idle browser or launches one, so a browser that is
+    retired simply frees its slot for the next waiter. Everything runs on
+    the _run_async loop.
     """
-    # First check if Playwright is available
-    try:
-        from playwright.async_api import async_playwright
-    except ImportError:
-        att.metadata['screenshot_error'] = "Playwright not available. Install with: pip install playwright && playwright install chromium"
-        return att
     
-    try:
+    POOL_SIZE = 4
+    MAX_USES_PER_INSTANCE = 50  # recycle browsers to bound Chromium memory growth
+    LAUNCH_ARGS = ['--disable-dev-shm-usage', '--no-sandbox']
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._playwright = None
+        self._idle = []  # [browser, uses, {viewport: context}] entries not in use
+        self._slots = None  # asyncio.Semaphore(POOL_SIZE), created on the loop
+    
+    def run(self, coro, timeout=None):
+        """Run a capture coroutine on the background loop, starting Playwright first if needed."""
+        with self._lock:
+            if self._playwright is None:
+                try:
+                    _run_async(self._start())
+                except BaseException:
+                    coro.close()
+                    raise
+        return _run_async(coro, timeout)
+    
+    async def _start(self):
         import asyncio
-        import base64
+        import atexit
+        from playwright.async_api import async_playwright
         
-        # Check if we have the original URL in metadata
-        if 'original_url' in att.metadata:
-            url = att.metadata['original_url']
+        self._playwright = await async_playwright().start()
+        self._slots = asyncio.Semaphore(self.POOL_SIZE)
+        atexit.register(self.close)
+    
+    async def _acquire(self):
+        # The caller holds a slot, so idle plus in-use browsers never exceed POOL_SIZE
+        if self._idle:
+            return self._idle.pop()
+        browser = await self._playwright.chromium.launch(args=self.LAUNCH_ARGS)
+        return [browser, 0, {}]
+    
+    async def _release(self, entry, broken=False):
+        entry[1] += 1
+        browser = entry[0]
+        if broken or entry[1] >= self.MAX_USES_PER_INSTANCE or not browser.is_connected():
+            # Retiring frees the slot; the next capture launches a replacement
+            try:
+                await browser.close()
+            except Exception:
+                pass
         else:
-            # Try to reconstruct URL from path (fallback)
-            url = att.path
-        
-        # Get DSL command parameters
-        viewport_str = att.commands.get('viewport', '1280x720')
-        fullpage = att.commands.get('fullpage', 'true').lower() == 'true'
-        wait_time = int(att.commands.get('wait', '200'))
-        
-        # Parse viewport dimensions
-        try:
-            width, height = map(int, viewport_str.split('x'))
-        except:
-            width, height = 1280, 720  # Default fallback
-        
-        async def capture_screenshot(url: str) -> str:
-            """Capture screenshot using Playwright."""
-            async with async_playwright() as p:
-                browser = await p.chromium.launch()
-                page = await browser.new_page(viewport={"width": width, "height": height})
-                
-                try:
-                    await page.goto(url, wait_until="networkidle")
-                    await page.wait_for_timeout(wait_time)  # Let fonts/images settle
-                    
-                    # Check if we have a CSS selector to highlight
-                    css_selector = att.commands.get('select')
-                    if css_selector:
-                        # Inject CSS to highlight selected elements (clean visual highlighting)
-                        highlight_css = """
-                        <style id="attachments-highlight">
-                        .attachments-highlighted {
-                            border: 5px solid #ff0080 !important;
-                            outline: 3px solid #ffffff !important;
-                            outline-offset: 2px !important;
-                            background-color: rgba(255, 0, 128, 0.1) !important;
-                            box-shadow: 
-                                0 0 0 8px rgba(255, 0, 128, 0.3),
-                                0 0 20px rgba(255, 0, 128, 0.5),
-                                inset 0 0 0 3px rgba(255, 255, 255, 0.8) !important;
-                            position: relative !important;
-                            z-index: 9999 !important;
-                            animation: attachments-glow 2s ease-in-out infinite alternate !important;
-                            margin: 10px !important;
-                            padding: 10px !important;
-                        }
-                        @keyframes attachments-glow {
-                            0% { 
-                                border-color: #ff0080;
-                                box-shadow: 
-                                    0 0 0 8px rgba(255, 0, 128, 0.3),
-                                    0 0 20px rgba(255, 0, 128, 0.5),
-                                    inset 0 0 0 3px rgba(255, 255, 255, 0.8);
-                                transform: scale(1);
-                            }
-                            100% { 
-                                border-color: #ff4da6;
-                                box-shadow: 
-                                    0 0 0 12px rgba(255, 0, 128, 0.4),
-                                    0 0 30px rgba(255, 0, 128, 0.7),
-                                    inset 0 0 0 3px rgba(255, 255, 255, 1);
-                                transform: scale(1.02);
-                            }
-                        }
-                        .attachments-highlighted::before {
-                            content: "";
-                            position: absolute !important;
-                            top: -8px !important;
-                            left: -8px !important;
-                            right: -8px !important;
-                            bottom: -8px !important;
-                            border: 3px dashed #00ff80 !important;
-                            border-radius: 8px !important;
-                            z-index: -1 !important;
-                            animation: attachments-dash 3s linear infinite !important;
-                        }
-                        @keyframes attachments-dash {
-                            0% { border-color: #00ff80; }
-                            33% { border-color: #ff0080; }
-                            66% { border-color: #0080ff; }
-                            100% { border-color: #00ff80; }
-                        }
-                        .attachments-highlighted::after {
-                            content: "🎯 SELECTED" !important;
-                            position: absolute !important;
-                            top: -45px !important;
-                            left: 50% !important;
-                            transform: translateX(-50%) !important;
-                            background: linear-gradient(135deg, #ff0080, #ff4da6) !important;
-                            color: white !important;
-                            padding: 10px 20px !important;
-                            font-size: 16px !important;
-                            font-weight: bold !important;
-                            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important;
-                            border-radius: 25px !important;
-                            z-index: 10001 !important;
-                            white-space: nowrap !important;
-                            box-shadow: 
-                                0 6px 20px rgba(0,0,0,0.4),
-                                0 0 0 3px rgba(255, 255, 255, 1),
-                                0 0 20px rgba(255, 0, 128, 0.6) !important;
-                            border: 3px solid rgba(255, 255, 255, 1) !important;
-                            animation: attachments-badge-bounce 2s ease-in-out infinite !important;
-                        }
-                        @keyframes attachments-badge-bounce {
-                            0%, 100% { transform: translateX(-50%) translateY(0px) scale(1); }
-                            50% { transform: translateX(-50%) translateY(-5px) scale(1.05); }
-                        }
-                        /* Special styling for multiple elements */
-                        .attachments-highlighted.multiple-selection::after {
-                            background: linear-gradient(135deg, #00ff80, #26ff9a) !important;
-                        }
-                        .attachments-highlighted.multiple-selection::before {
-                            border-style: solid !important;
-                            border-width: 4px !important;
-                        }
-                        /* Ensure visibility over any background */
-                        .attachments-highlighted {
-                            backdrop-filter: blur(2px) contrast(1.2) !important;
-                        }
-                        /* Make sure text inside highlighted elements is readable */
-                        .attachments-highlighted * {
-                            text-shadow: 0 0 5px rgba(255, 255, 255, 1) !important;
-                        }
-                        /* Add a pulsing outer glow */
-                        .attachments-highlighted {
-                            filter: drop-shadow(0 0 15px rgba(255, 0, 128, 0.8)) !important;
-                        }
-                        </style>
-                        """
-                        
-                        # Inject the CSS
-                        await page.add_style_tag(content=highlight_css)
-                        
-                        # Add highlighting class to selected elements
-                        highlight_script = f"""
-                        try {{
-                            const elements = document.querySelectorAll('{css_selector}');
-                            elements.forEach((el, index) => {{
-                                el.classList.add('attachments-highlighted');
-                                
-                                // Add special class for multiple selections
-                                if (elements.length > 1) {{
-                                    el.classList.add('multiple-selection');
-                                    // Create a unique style for each element's counter
-                                    const style = document.createElement('style');
-                                    const uniqueClass = 'attachments-element-' + index;
-                                    el.classList.add(uniqueClass);
-                                    style.textContent = 
-                                        '.' + uniqueClass + '::after {{' +
-                                        'content: "🎯 ' + el.tagName.toUpperCase() + ' (' + (index + 1) + '/' + elements.length + ')" !important;' +
-                                        '}}';
-                                    document.head.appendChild(style);
-                                }} else {{
-                                    // Single element - show tag name in badge
-                                    const style = document.createElement('style');
-                                    const uniqueClass = 'attachments-element-' + index;
-                                    el.classList.add(uniqueClass);
-                                    style.textContent = 
-                                        '.' + uniqueClass + '::after {{' +
-                                        'content: "🎯 ' + el.tagName.toUpperCase() + ' SELECTED" !important;' +
-                                        '}}';
-                                    document.head.appendChild(style);
-                                }}
-                                
-                                // Scroll the first element into view for better visibility
-                                if (index === 0) {{
-                                    el.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-                                }}
-                            }});
-                            
-                            console.log('Highlighted ' + elements.length + ' elements with selector: {css_selector}');
-                            elements.length;
-                        }} catch (e) {{
-                            console.error('Error highlighting elements:', e);
-                            0;
-                        }}
-                        """
-                        
-                        element_count = await page.evaluate(highlight_script)
-                        
-                        # Wait longer for highlighting and animations to render
-                        await page.wait_for_timeout(500)
-                        
-                        # Store highlighting info in metadata
-                        att.metadata.update({
-                            'highlighted_selector': css_selector,
-                            'highlighted_elements': element_count
-                        })
-                    
-                    # Capture screenshot
-                    png_bytes = await page.screenshot(full_page=fullpage)
-                    
-                    # Encode as base64 data URL
-                    b64_string = base64.b64encode(png_bytes).decode('utf-8')
-                    return f"data:image/png;base64,{b64_string}"
-                    
-                finally:
-                    await browser.close()
-        
-        # Capture the screenshot with proper async handling for Jupyter
-        try:
-            # Check if we're already in an event loop (like in Jupyter)
+            self._idle.append(entry)
+    
+    async def _new_context(self, browser, viewport):
+        context = await browser.new_context(viewport=viewport, service_workers='allow')
+        await context.add_init_script(script=_HIGHLIGHT_INIT_JS)
+        return context
+    
+    @asynccontextmanager
+    async def page(self, viewport, fresh=False):
+        """
+        Yield a page on a pooled browser.
+        
+        Pages share one long-lived context per viewport on each browser, so
+        Chromium's HTTP cache carries over between captures of the same
+        site; fresh=True uses a throwaway context instead.
+        """
+        async with self._slots:
+            entry = await self._acquire()
+            browser, contexts = entry[0], entry[2]
+            key = (viewport['width'], viewport['height'])
+            context = None if fresh else contexts.get(key)
+            page = None
+            broken = False
             try:
-                loop = asyncio.get_running_loop()
-                # We're in an event loop (Jupyter), use nest_asyncio or create_task
+                if context is None:
+                    context = await self._new_context(browser, viewport)
+                    if not fresh:
+                        contexts[key] = context
+                page = await context.new_page()
+                yield page
+            finally:
                 try:
-                    import nest_asyncio
-                    nest_asyncio.apply()
-                    screenshot_data = asyncio.run(capture_screenshot(url))
-                except ImportError:
-                    # nest_asyncio not available, try alternative approach
-                    # Create a new thread to run the async code
-                    import concurrent.futures
-                    import threading
-                    
-                    def run_in_thread():
-                        # Create a new event loop in this thread
-                        new_loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(new_loop)
-                        try:
-                            return new_loop.run_until_complete(capture_screenshot(url))
-                        finally:
-                            new_loop.close()
-                    
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(run_in_thread)
-                        screenshot_data = future.result(timeout=30)  # 30 second timeout
-                        
-            except RuntimeError:
-                # No event loop running, safe to use asyncio.run()
-                screenshot_data = asyncio.run(capture_screenshot(url))
+                    if fresh and context is not None:
+                        await context.close()
+                    elif page is not None:
+                        await page.close()
+                except Exception:
+                    broken = True
+                await self._release(entry, broken or context is None)
+    
+    def close(self):
+        """Close pooled browsers and stop Playwright (registered with atexit)."""
+        with self._lock:
+            if self._playwright is None:
+                return
             
-            att.images.append(screenshot_data)
+            async def shutdown():
+                while self._idle:
+                    await self._idle.pop()[0].close()
+                await self._playwright.stop()
             
-            # Add metadata about screenshot
-            att.metadata.update({
-                'screenshot_captured': True,
-                'screenshot_viewport': f"{width}x{height}",
-                'screenshot_fullpage': fullpage,
-                'screenshot_wait_time': wait_time,
-                'screenshot_url': url
-            })
+            try:
+                _run_async(shutdown(), timeout=10)
+            except Exception:
+                pass
+            finally:
+                self._playwright, self._idle, self._slots = None, [], None
+
+
+_BROWSER_POOL = _BrowserPool()
+
+
+# Stylesheet for elements matched by [select:...] in webpage screenshots
+_HIGHLIGHT_CSS = """
+.attachments-highlighted {
+    border: 5px solid #ff0080 !important;
+    outline: 3px solid #ffffff !important;
+    outline-offset: 2px !important;
+    background-color: rgba(255, 0, 128, 0.1) !important;
+    box-shadow: 
+        0 0 0 8px rgba(255, 0, 128, 0.3),
+        0 0 20px rgba(255, 0, 128, 0.5),
+        inset 0 0 0 3px rgba(255, 255, 255, 0.8) !important;
+    position: relative !important;
+    z-index: 9999 !important;
+    animation: attachments-glow 2s ease-in-out infinite alternate !important;
+    margin: 10px !important;
+    padding: 10px !important;
+}
+@keyframes attachments-glow {
+    0% { 
+        border-color: #ff0080;
+        box-shadow: 
+            0 0 0 8px rgba(255, 0, 128, 0.3),
+            0 0 20px rgba(255, 0, 128, 0.5),
+            inset 0 0 0 3px rgba(255, 255, 255, 0.8);
+        transform: scale(1);
+    }
+    100% { 
+        border-color: #ff4da6;
+        box-shadow: 
+            0 0 0 12px rgba(255, 0, 128, 0.4),
+            0 0 30px rgba(255, 0, 128, 0.7),
+            inset 0 0 0 3px rgba(255, 255, 255, 1);
+        transform: scale(1.02);
+    }
+}
+.attachments-highlighted::before {
+    content: "";
+    position: absolute !important;
+    top: -8px !important;
+    left: -8px !important;
+    right: -8px !important;
+    bottom: -8px !important;
+    border: 3px dashed #00ff80 !important;
+    border-radius: 8px !important;
+    z-index: -1 !important;
+    animation: attachments-dash 3s linear infinite !important;
+}
+@keyframes attachments-dash {
+    0% { border-color: #00ff80; }
+    33% { border-color: #ff0080; }
+    66% { border-color: #0080ff; }
+    100% { border-color: #00ff80; }
+}
+.attachments-highlighted::after {
+    content: "🎯 SELECTED" !important;
+    position: absolute !important;
+    top: -45px !important;
+    left: 50% !important;
+    transform: translateX(-50%) !important;
+    background: linear-gradient(135deg, #ff0080, #ff4da6) !important;
+    color: white !important;
+    padding: 10px 20px !important;
+    font-size: 16px !important;
+    font-weight: bold !important;
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif !important;
+    border-radius: 25px !important;
+    z-index: 10001 !important;
+    white-space: nowrap !important;
+    box-shadow: 
+        0 6px 20px rgba(0,0,0,0.4),
+        0 0 0 3px rgba(255, 255, 255, 1),
+        0 0 20px rgba(255, 0, 128, 0.6) !important;
+    border: 3px solid rgba(255, 255, 255, 1) !important;
+    animation: attachments-badge-bounce 2s ease-in-out infinite !important;
+}
+@keyframes attachments-badge-bounce {
+    0%, 100% { transform: translateX(-50%) translateY(0px) scale(1); }
+    50% { transform: translateX(-50%) translateY(-5px) scale(1.05); }
+}
+/* Special styling for multiple elements */
+.attachments-highlighted.multiple-selection::after {
+    background: linear-gradient(135deg, #00ff80, #26ff9a) !important;
+}
+.attachments-highlighted.multiple-selection::before {
+    border-style: solid !important;
+    border-width: 4px !important;
+}
+/* Ensure visibility over any background */
+.attachments-highlighted {
+    backdrop-filter: blur(2px) contrast(1.2) !important;
+}
+/* Make sure text inside highlighted elements is readable */
+.attachments-highlighted * {
+    text-shadow: 0 0 5px rgba(255, 255, 255, 1) !important;
+}
+/* Add a pulsing outer glow */
+.attachments-highlighted {
+    filter: drop-shadow(0 0 15px rgba(255, 0, 128, 0.8)) !important;
+}
+"""
+
+# Installed in every screenshot context with add_init_script, so V8 compiles it once
+# per context; a capture then only calls __attachmentsHighlight(selector), which adds
+# _HIGHLIGHT_CSS once, marks every match and returns the count.
+_HIGHLIGHT_INIT_JS = """
+(() => {
+    const css = __CSS__;
+    window.__attachmentsHighlight = (selector) => {
+        try {
+            if (!document.getElementById('attachments-highlight')) {
+                const sheet = document.createElement('style');
+                sheet.id = 'attachments-highlight';
+                sheet.textContent = css;
+                document.head.appendChild(sheet);
+            }
             
+            const elements = document.querySelectorAll(selector);
+            elements.forEach((el, index) => {
+                el.classList.add('attachments-highlighted');
+                
+                // Add special class for multiple selections
+                if (elements.length > 1) {
+                    el.classList.add('multiple-selection');
+                }
+                
+                // Per-element badge: tag name plus position for multiple selections
+                const uniqueClass = 'attachments-element-' + index;
+                el.classList.add(uniqueClass);
+                const label = elements.length > 1
+                    ? el.tagName.toUpperCase() + ' (' + (index + 1) + '/' + elements.length + ')'
+                    : el.tagName.toUpperCase() + ' SELECTED';
+                const style = document.createElement('style');
+                style.textContent = '.' + uniqueClass + '::after {content: "🎯 ' + label + '" !important;}';
+                document.head.appendChild(style);
+                
+                // Scroll the first element into view for better visibility
+                if (index === 0) {
+                    el.scrollIntoView({ behavior: 'instant', block: 'center' });
+                }
+            });
+            
+            return elements.length;
+        } catch (e) {
+            console.error('Error highlighting elements:', e);
+            return 0;
+        }
+    };
+})();
+""".replace('__CSS__', json.dumps(_HIGHLIGHT_CSS))
+
+
+# Upper bound on one capture; navigation itself is bounded by Playwright's own timeouts
+_SCREENSHOT_TIMEOUT = 60
+
+
+def _screenshot_settings(att: Attachment):
+    """Read URL, viewport, fullpage and readiness settings for a webpage screenshot."""
+    # Check if we have the original URL in metadata
+    if 'original_url' in att.metadata:
+        url = att.metadata['original_url']
+    else:
+        # Try to reconstruct URL from path (fallback)
+        url = att.path
+    
+    # Get DSL command parameters
+    viewport_str = att.commands.get('viewport', '1280x720')
+    fullpage = att.commands.get('fullpage', 'true').lower() == 'true'
+    # An extra settle delay only when asked for; readiness comes from wait_until/select
+    wait_time = int(att.commands.get('wait', '0'))
+    wait_until = att.commands.get('wait_until', 'domcontentloaded')
+    # Chromium screenshots come as PNG or JPEG; JPEG is much smaller and faster to encode
+    image_format = att.commands.get('image_format', 'png').lower()
+    image_format = 'jpeg' if image_format in ('jpeg', 'jpg') else 'png'
+    
+    # Parse viewport dimensions
+    try:
+        width, height = map(int, viewport_str.split('x'))
+    except:
+        width, height = 1280, 720  # Default fallback
+    
+    return {
+        'url': url, 'width': width, 'height': height, 'fullpage': fullpage,
+        'wait_time': wait_time, 'wait_until': wait_until,
+        'fresh': att.commands.get('fresh', 'false').lower() == 'true',
+        'image_format': image_format,
+        'image_quality': int(att.commands.get('image_quality', 85)),
+        'optimize': att.commands.get('optimize', 'false').lower() == 'true',
+        'block_resources': frozenset(
+            kind.strip().lower() for kind in att.commands.get('block_resources', '').split(',') if kind.strip()
+        ),
+    }
+
+
+async def _capture_screenshot(att: Attachment, settings):
+    """Capture a screenshot on a pooled browser; return its data URL and highlight metadata."""
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    
+    highlight = {}
+    viewport = {"width": settings['width'], "height": settings['height']}
+    async with _BROWSER_POOL.page(viewport, fresh=settings['fresh']) as page:
+        blocked = settings['block_resources']
+        if blocked:
+            # Routing turns off the HTTP cache for this page, hence opt-in only
+            async def block(route):
+                if route.request.resource_type in blocked:
+                    await route.abort()
+                else:
+                    await route.continue_()
+            
+            await page.route("**/*", block)
+        
+        await page.goto(settings['url'], wait_until=settings['wait_until'])
+        if settings['wait_time']:
+            await page.wait_for_timeout(settings['wait_time'])  # Let fonts/images settle
+        
+        # Check if we have a CSS selector to highlight
+        css_selector = att.commands.get('select')
+        if css_selector:
+            # Wait for the selected content itself rather than for the whole network
+            try:
+                await page.wait_for_selector(css_selector, state='visible', timeout=5000)
+            except PlaywrightTimeoutError:
+                pass  # Highlight whatever matches now (possibly nothing)
+            
+            # Inject the highlight stylesheet and mark the selected elements in one round-trip
+            element_count = await page.evaluate(
+                "selector => window.__attachmentsHighlight(selector)", css_selector)
+            
+            highlight = {
+                'highlighted_selector': css_selector,
+                'highlighted_elements': element_count
+            }
+        
+        # Capture screenshot
+        # Animations are frozen so the highlight needs no settle time and shots are deterministic
+        image_format = settings['image_format']
+        image_bytes = await page.screenshot(
+            full_page=settings['fullpage'],
+            type=image_format,
+            quality=settings['image_quality'] if image_format == 'jpeg' else None,
+            animations='disabled',
+            caret='hide',
+        )
+    
+    if settings['optimize'] and image_format == 'png':
+        # Lossless recompression: a smaller payload for more CPU time, so off the loop
+        try:
+            import oxipng
+        except ImportError:
+            pass
+        else:
+            import asyncio
+            image_bytes = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: oxipng.optimize_from_memory(image_bytes, level=2))
+    
+    # Encode as base64 data URL; large fullpage shots are encoded on a worker thread so
+    # other captures on the loop keep going meanwhile (the page is already released)
+    if len(image_bytes) >= _SCREENSHOT_OFFLOAD_BYTES:
+        import asyncio
+        b64_string = await asyncio.get_running_loop().run_in_executor(None, _b64_ascii, image_bytes)
+    else:
+        b64_string = _b64_ascii(image_bytes)
+    return f"data:image/{image_format};base64,{b64_string}", highlight
+
+
+# Screenshots at least this large are base64-encoded off the event loop
+_SCREENSHOT_OFFLOAD_BYTES = 256 * 1024
+
+
+def _b64_ascii(data: bytes) -> str:
+    return base64.b64encode(data).decode('ascii')
+
+
+# Recent screenshots keyed by everything that affects the rendered image, most
+# recent last. Only touched from the _run_async loop, so it needs no lock.
+_SCREENSHOT_CACHE = OrderedDict()
+_SCREENSHOT_CACHE_MAX = 128
+
+
+async def _screenshot_attachment(att: Attachment, settings) -> None:
+    """Capture one attachment's screenshot, recording the image or the error on it."""
+    key = (settings['url'], settings['width'], settings['height'], settings['fullpage'],
+           settings['wait_until'], settings['wait_time'], att.commands.get('select'),
+           settings['image_format'], settings['image_quality'], settings['block_resources'],
+           settings['optimize'])
+    use_cache = att.commands.get('cache', 'true').lower() != 'false' and not settings['fresh']
+    cached = use_cache and _SCREENSHOT_CACHE.get(key)
+    if cached:
+        _SCREENSHOT_CACHE.move_to_end(key)
+        screenshot_data, highlight = cached
+    else:
+        try:
+            screenshot_data, highlight = await _capture_screenshot(att, settings)
         except Exception as e:
             # Add error info to metadata instead of failing
             att.metadata['screenshot_error'] = f"Error capturing screenshot: {str(e)}"
-        
+            return
+        _SCREENSHOT_CACHE[key] = (screenshot_data, highlight)
+        _SCREENSHOT_CACHE.move_to_end(key)
+        if len(_SCREENSHOT_CACHE) > _SCREENSHOT_CACHE_MAX:
+            _SCREENSHOT_CACHE.popitem(last=False)
+    
+    att.images.append(screenshot_data)
+    
+    # Add metadata about screenshot (highlight info included) in one update; a
+    # successful capture also clears an error left by an earlier attempt
+    att.metadata.pop('screenshot_error', None)
+    att.metadata.update({
+        **highlight,
+        'screenshot_captured': True,
+        'screenshot_cached': bool(cached),
+        'screenshot_viewport': f"{settings['width']}x{settings['height']}",
+        'screenshot_fullpage': settings['fullpage'],
+        'screenshot_wait_time': settings['wait_time'],
+        'screenshot_wait_until': settings['wait_until'],
+        'screenshot_format': settings['image_format'],
+        'screenshot_url': settings['url']
+    })
+
+
+def _playwright_available() -> bool:
+    """Whether Playwright is installed, checked without importing it."""
+    import importlib.util
+    return importlib.util.find_spec('playwright') is not None
+
+
+async def _capture_many(jobs, max_concurrency: int = 5) -> None:
+    """Run _screenshot_attachment for (att, settings) pairs, at most max_concurrency at a time."""
+    import asyncio
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def bounded(att, settings):
+        async with semaphore:
+            await _screenshot_attachment(att, settings)
+    
+    await asyncio.gather(*(bounded(att, settings) for att, settings in jobs), return_exceptions=True)
+
+
+@presenter
+def images(att: Attachment, soup: 'bs4.BeautifulSoup') -> Attachment:
+    """Capture webpage screenshot using Playwright with JavaScript rendering and CSS selector highlighting.
+    
+    Supports DSL commands:
+    - viewport: 1280x720 for browser viewport size (default: 1280x720)
+    - fullpage: true|false for full page vs viewport screenshot (default: true)
+    - wait_until: load|domcontentloaded|networkidle|commit navigation readiness (default: domcontentloaded)
+    - wait: 2000 for extra page settling time in milliseconds (default: 0)
+    - select: CSS selector to highlight elements in the screenshot (waited for, up to 5 s)
+    - cache: true|false to reuse a recent identical screenshot (default: true)
+    - fresh: true|false to load in a new browser context, without cookies or HTTP cache from earlier captures (default: false)
+    - image_format: png|jpeg screenshot encoding (default: png); image_quality: 1-100 for JPEG (default: 85)
+    - optimize: true|false to losslessly shrink PNG screenshots with oxipng when installed;
+      trades extra CPU time for a smaller payload (default: false)
+    - block_resources: image,media,font to skip loading those request types; faster for
+      text-heavy pages, but the page then bypasses the shared HTTP cache (default: none)
+    """
+    # First check if Playwright is available
+    if not _playwright_available():
+        att.metadata['screenshot_error'] = "Playwright not available. Install with: pip install playwright && playwright install chromium"
         return att
-        
+    
+    try:
+        settings = _screenshot_settings(att)
     except Exception as e:
         att.metadata['screenshot_error'] = f"Error setting up screenshot: {str(e)}"
         return att
+    
+    try:
+        _BROWSER_POOL.run(_screenshot_attachment(att, settings), timeout=_SCREENSHOT_TIMEOUT)
+    except Exception as e:
+        att.metadata['screenshot_error'] = f"Error capturing screenshot: {str(e)}"
+    
+    return att
+
+
+def screenshot_batch(atts, max_concurrency: int = 5):
+    """Screenshot several webpage attachments concurrently on the shared browser pool.
+    
+    Takes a list (or AttachmentCollection) of attachments loaded from URLs
+    and captures up to max_concurrency pages at once, so the total wait is
+    roughly the slowest page per window instead of the sum of all pages.
+    Each attachment gets the same image and metadata the images presenter
+    would add; a failure is recorded on that attachment only.
+    """
+    atts = list(atts)
+    if not _playwright_available():
+        for att in atts:
+            att.metadata['screenshot_error'] = "Playwright not available. Install with: pip install playwright && playwright install chromium"
+        return atts
+    
+    jobs = []
+    for att in atts:
+        try:
+            jobs.append((att, _screenshot_settings(att)))
+        except Exception as e:
+            att.metadata['screenshot_error'] = f"Error setting up screenshot: {str(e)}"
+    
+    # Each window of max_concurrency captures gets the single-capture budget
+    windows = max(1, -(-len(jobs) // max(1, max_concurrency)))
+    try:
+        _BROWSER_POOL.run(_capture_many(jobs, max_concurrency), timeout=_SCREENSHOT_TIMEOUT * windows)
+    except Exception as e:
+        for att, _ in jobs:
+            att.metadata.setdefault('screenshot_error', f"Error capturing screenshot: {str(e)}")
+    
+    return atts
+
+
+# Markdown prefix/suffix per block tag for the markdownify-less fallback
+_HTML_BLOCK_MARKDOWN = {
+    'h1': ("# ", "\n\n"),
+    'h2': ("## ", "\n\n"),
+    'h3': ("### ", "\n\n"),
+    'h4': ("#### ", "\n\n"),
+    'h5': ("##### ", "\n\n"),
+    'h6': ("###### ", "\n\n"),
+    'p': ("", "\n\n"),
+    'li': ("- ", "\n"),
+    'blockquote': ("> ", "\n\n"),
+}
 
 
 @presenter  
@@ -1738,64 +3254,62 @@ def markdown(att: Attachment, soup: 'bs4.BeautifulSoup') -> Attachment:
         # Try to use markdownify if available for better HTML->markdown conversion
         try:
             import markdownify
-            # Convert HTML to markdown with reasonable settings
-            markdown_text = markdownify.markdownify(
-                str(soup), 
+            options = dict(
                 heading_style="ATX",  # Use # style headings
                 bullets="-",          # Use - for bullets
                 strip=['script', 'style']  # Remove script and style tags
             )
-            att.text += markdown_text
+            if hasattr(markdownify.MarkdownConverter, 'convert_soup'):
+                # Walk the already-parsed tree instead of serializing it and parsing it again
+                markdown_text = markdownify.MarkdownConverter(**options).convert_soup(soup)
+            else:
+                markdown_text = markdownify.markdownify(str(soup), **options)
+            att.append_text(markdown_text)
         except ImportError:
             # Fallback: basic markdown conversion
+            # One pass over the tree collects the title, block elements in order, and links
+            title = None
+            parts = []
+            links = []
+            link_count = 0
+            for element in soup.descendants:
+                name = element.name  # None for text nodes
+                if name in _HTML_BLOCK_MARKDOWN:
+                    text = element.get_text().strip()
+                    if text:
+                        prefix, suffix = _HTML_BLOCK_MARKDOWN[name]
+                        parts.append(f"{prefix}{text}{suffix}")
+                elif name == 'a':
+                    if element.get('href') is not None:
+                        link_count += 1
+                        if len(links) < 10:  # Limit to first 10 links
+                            links.append(element)
+                elif name == 'title' and title is None:
+                    title = element
+            
             # Extract title
-            title = soup.find('title')
             if title and title.get_text().strip():
-                att.text += f"# {title.get_text().strip()}\n\n"
-            
-            # Extract headings and paragraphs in order
-            for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'li', 'blockquote']):
-                tag_name = element.name
-                text = element.get_text().strip()
-                
-                if text:
-                    if tag_name == 'h1':
-                        att.text += f"# {text}\n\n"
-                    elif tag_name == 'h2':
-                        att.text += f"## {text}\n\n"
-                    elif tag_name == 'h3':
-                        att.text += f"### {text}\n\n"
-                    elif tag_name == 'h4':
-                        att.text += f"#### {text}\n\n"
-                    elif tag_name == 'h5':
-                        att.text += f"##### {text}\n\n"
-                    elif tag_name == 'h6':
-                        att.text += f"###### {text}\n\n"
-                    elif tag_name == 'p':
-                        att.text += f"{text}\n\n"
-                    elif tag_name == 'li':
-                        att.text += f"- {text}\n"
-                    elif tag_name == 'blockquote':
-                        att.text += f"> {text}\n\n"
+                parts.insert(0, f"# {title.get_text().strip()}\n\n")
             
             # Extract links
-            links = soup.find_all('a', href=True)
-            if links:
-                att.text += "\n## Links\n\n"
-                for link in links[:10]:  # Limit to first 10 links
+            if link_count:
+                parts.append("\n## Links\n\n")
+                for link in links:
                     link_text = link.get_text().strip()
                     href = link.get('href')
                     if link_text and href:
-                        att.text += f"- [{link_text}]({href})\n"
-                if len(links) > 10:
-                    att.text += f"- ... and {len(links) - 10} more links\n"
-                att.text += "\n"
+                        parts.append(f"- [{link_text}]({href})\n")
+                if link_count > 10:
+                    parts.append(f"- ... and {link_count - 10} more links\n")
+                parts.append("\n")
+            
+            att.append_text("".join(parts))
                 
     except Exception as e:
         # Ultimate fallback
-        att.text += f"# {att.path}\n\n"
-        att.text += soup.get_text()[:1000] + "...\n\n"
-        att.text += f"*Error converting to markdown: {e}*\n"
+        att.append_text(f"# {att.path}\n\n")
+        att.append_text(soup.get_text()[:1000] + "...\n\n")
+        att.append_text(f"*Error converting to markdown: {e}*\n")
     
     return att
 
@@ -1809,11 +3323,11 @@ def structure(att: Attachment, repo_structure: dict) -> Attachment:
         structure = repo_structure['structure']
         base_path = repo_structure['path']
         
-        att.text += _format_structure_tree(structure, base_path)
+        att.append_text(_format_structure_tree(structure, base_path))
         
         # Add summary info
         file_count = len(repo_structure['files'])
-        att.text += f"\n*Total files: {file_count}*\n\n"
+        att.append_text(f"\n*Total files: {file_count}*\n\n")
         
         # Remove _file_paths to prevent file expansion
         if hasattr(att, '_file_paths'):
@@ -1831,7 +3345,7 @@ def metadata(att: Attachment, repo_structure: dict) -> Attachment:
         repo_path = repo_structure['path']
         repo_metadata = repo_structure['metadata']
         
-        att.text += _format_structure_with_metadata(structure, repo_path, repo_metadata)
+        att.append_text(_format_structure_with_metadata(structure, repo_path, repo_metadata))
         
     elif repo_structure.get('type') == 'directory':
         # Regular directory with basic metadata
@@ -1839,7 +3353,7 @@ def metadata(att: Attachment, repo_structure: dict) -> Attachment:
         dir_path = repo_structure['path']
         dir_metadata = repo_structure['metadata']
         
-        att.text += _format_directory_with_metadata(structure, dir_path, dir_metadata)
+        att.append_text(_format_directory_with_metadata(structure, dir_path, dir_metadata))
     
     # Remove _file_paths to prevent file expansion
     if hasattr(att, '_file_paths'):
@@ -1855,12 +3369,13 @@ def files(att: Attachment, repo_structure: dict) -> Attachment:
         base_path = repo_structure['path']
         files = repo_structure['files']
         
-        # Add directory map
-        att.text += _format_directory_map(base_path, files)
+        # Add directory map (sizes come from the loader's tree, not fresh stat calls)
+        directory_map = _format_directory_map(base_path, files, repo_structure.get('structure'))
+        att.append_text(directory_map)
         
         # Store file paths for Attachments() to expand
         att.metadata['file_paths'] = files
-        att.metadata['directory_map'] = _format_directory_map(base_path, files)
+        att.metadata['directory_map'] = directory_map
         
     return att
 
@@ -1868,136 +3383,155 @@ def files(att: Attachment, repo_structure: dict) -> Attachment:
 # Helper functions for repository formatting (moved from load.py)
 def _format_structure_tree(structure: dict, base_path: str) -> str:
     """Format directory structure as a tree."""
-    import os
-    
-    result = f"# Directory Structure: {os.path.basename(base_path)}\n\n"
-    result += "```\n"
-    result += f"{os.path.basename(base_path)}/\n"
-    result += _format_tree_recursive(structure, "")
-    result += "```\n\n"
-    return result
+    parts = [
+        f"# Directory Structure: {os.path.basename(base_path)}\n\n",
+        "```\n",
+        f"{os.path.basename(base_path)}/\n",
+    ]
+    _format_tree_lines(structure, "", parts)
+    parts.append("```\n\n")
+    return "".join(parts)
 
 
 def _format_tree_recursive(structure: dict, prefix: str = "", is_root: bool = False) -> str:
     """Recursively format directory tree structure."""
-    result = ""
-    
-    # Handle flat structure format from _get_directory_structure
-    items = []
-    for name, item in structure.items():
-        items.append((name, item))
-    
-    # Sort items: directories first, then files
-    items.sort(key=lambda x: (x[1].get('type', 'directory') == 'file', x[0].lower()))
-    
-    for i, (name, item) in enumerate(items):
-        is_last = i == len(items) - 1
+    parts = []
+    _format_tree_lines(structure, prefix, parts)
+    return "".join(parts)
+
+
+def _format_tree_lines(structure: dict, prefix: str, out: list) -> None:
+    """Append the tree lines for structure to out, recursing into directories."""
+    # Directory nodes carry their own stat fields next to their children; only dict values are entries.
+    # Sort items: directories first, then files (names are unique, so item dicts are never compared)
+    items = [(item.get('type') == 'file', name.lower(), name, item)
+             for name, item in structure.items() if isinstance(item, dict)]
+    items.sort()
+    
+    last = len(items) - 1
+    for i, (is_file, _, name, item) in enumerate(items):
+        is_last = i == last
         current_prefix = "└── " if is_last else "├── "
         
-        if item.get('type') == 'file':
+        if is_file:
             # File with size
             size_str = _format_file_size(item.get('size', 0))
-            result += f"{prefix}{current_prefix}{name} ({size_str})\n"
+            out.append(f"{prefix}{current_prefix}{name} ({size_str})\n")
         else:
             # Directory - item is a nested dictionary
-            result += f"{prefix}{current_prefix}{name}/\n"
+            out.append(f"{prefix}{current_prefix}{name}/\n")
             # Recursively add children
             next_prefix = prefix + ("    " if is_last else "│   ")
-            result += _format_tree_recursive(item, next_prefix)
-    
-    return result
+            _format_tree_lines(item, next_prefix, out)
+
+
+def _structure_file_size(structure: dict, rel_path: str):
+    """Size recorded for rel_path in a nested directory structure, or None."""
+    node = structure
+    for part in rel_path.split(os.sep):
+        node = node.get(part)
+        if not isinstance(node, dict):
+            return None
+    return node.get('size') if node.get('type') == 'file' else None
+
+
+_FILE_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB', 'PB')
 
 
 def _format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024:
-            return f"{size_bytes:.1f}{unit}"
-        size_bytes /= 1024
-    return f"{size_bytes:.1f}TB"
+    size_bytes = int(size_bytes)
+    if size_bytes <= 0:
+        return "0.0B"
+    # Each unit is 2**10 of the previous one, so the unit index falls out of the bit length
+    unit = min((size_bytes.bit_length() - 1) // 10, len(_FILE_SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (10 * unit)):.1f}{_FILE_SIZE_UNITS[unit]}"
 
 
 def _format_structure_with_metadata(structure: dict, repo_path: str, metadata: dict) -> str:
     """Format Git repository structure with metadata."""
-    import os
-    
-    result = f"# Git Repository: {os.path.basename(repo_path)}\n\n"
+    parts = [f"# Git Repository: {os.path.basename(repo_path)}\n\n"]
     
     # Add Git metadata
-    result += "## Repository Information\n\n"
+    parts.append("## Repository Information\n\n")
     if metadata.get('current_branch'):
-        result += f"**Branch**: {metadata['current_branch']}\n"
+        parts.append(f"**Branch**: {metadata['current_branch']}\n")
     if metadata.get('remote_url'):
-        result += f"**Remote**: {metadata['remote_url']}\n"
+        parts.append(f"**Remote**: {metadata['remote_url']}\n")
     if metadata.get('last_commit'):
         commit = metadata['last_commit']
-        result += f"**Last Commit**: {commit['hash'][:8]} - {commit['message']}\n"
-        result += f"**Author**: {commit['author']} ({commit['date']})\n"
+        parts.append(f"**Last Commit**: {commit['hash'][:8]} - {commit['message']}\n")
+        parts.append(f"**Author**: {commit['author']} ({commit['date']})\n")
     if metadata.get('commit_count'):
-        result += f"**Total Commits**: {metadata['commit_count']}\n"
+        parts.append(f"**Total Commits**: {metadata['commit_count']}\n")
     
-    result += "\n"
+    parts.append("\n")
     
     # Add directory structure
-    result += "## Directory Structure\n\n"
-    result += "```\n"
-    result += f"{os.path.basename(repo_path)}/\n"
-    result += _format_tree_recursive(structure, "")
-    result += "```\n\n"
+    parts.append("## Directory Structure\n\n")
+    parts.append("```\n")
+    parts.append(f"{os.path.basename(repo_path)}/\n")
+    _format_tree_lines(structure, "", parts)
+    parts.append("```\n\n")
     
-    return result
+    return "".join(parts)
 
 
 def _format_directory_with_metadata(structure: dict, dir_path: str, metadata: dict) -> str:
     """Format directory structure with basic metadata."""
-    import os
-    
-    result = f"# Directory: {os.path.basename(dir_path)}\n\n"
+    parts = [f"# Directory: {os.path.basename(dir_path)}\n\n"]
     
     # Add basic metadata
-    result += "## Directory Information\n\n"
-    result += f"**Path**: {dir_path}\n"
+    parts.append("## Directory Information\n\n")
+    parts.append(f"**Path**: {dir_path}\n")
     if metadata.get('total_size'):
-        result += f"**Total Size**: {_format_file_size(metadata['total_size'])}\n"
+        parts.append(f"**Total Size**: {_format_file_size(metadata['total_size'])}\n")
     if metadata.get('file_count'):
-        result += f"**Files**: {metadata['file_count']}\n"
+        parts.append(f"**Files**: {metadata['file_count']}\n")
     if metadata.get('directory_count'):
-        result += f"**Directories**: {metadata['directory_count']}\n"
+        parts.append(f"**Directories**: {metadata['directory_count']}\n")
     
-    result += "\n"
+    parts.append("\n")
     
     # Add directory structure
-    result += "## Directory Structure\n\n"
-    result += "```\n"
-    result += f"{os.path.basename(dir_path)}/\n"
-    result += _format_tree_recursive(structure, "")
-    result += "```\n\n"
+    parts.append("## Directory Structure\n\n")
+    parts.append("```\n")
+    parts.append(f"{os.path.basename(dir_path)}/\n")
+    _format_tree_lines(structure, "", parts)
+    parts.append("```\n\n")
     
-    return result
+    return "".join(parts)
 
 
-def _format_directory_map(base_path: str, files: list) -> str:
-    """Format directory map showing file organization."""
-    import os
+def _format_directory_map(base_path: str, files: list, structure: dict = None) -> str:
+    """Format directory map showing file organization.
     
-    result = f"## Directory Map\n\n"
-    result += f"**Base Path**: `{base_path}`\n\n"
-    result += f"**Files Found**: {len(files)}\n\n"
+    File sizes are read from structure (as built by the directory loaders)
+    when given; only files missing from it are stat'ed.
+    """
+    parts = [
+        "## Directory Map\n\n",
+        f"**Base Path**: `{base_path}`\n\n",
+        f"**Files Found**: {len(files)}\n\n",
+    ]
     
     if files:
-        result += "**File List**:\n"
-        for file_path in sorted(files[:20]):  # Show first 20 files
+        parts.append("**File List**:\n")
+        # Show first 20 files; the directory loaders already return files sorted
+        for file_path in files[:20]:
             rel_path = os.path.relpath(file_path, base_path)
+            size = _structure_file_size(structure, rel_path) if structure else None
             try:
-                size = os.path.getsize(file_path)
+                if size is None:
+                    size = os.stat(file_path).st_size
                 size_str = _format_file_size(size)
-                result += f"- `{rel_path}` ({size_str})\n"
+                parts.append(f"- `{rel_path}` ({size_str})\n")
             except:
-                result += f"- `{rel_path}`\n"
+                parts.append(f"- `{rel_path}`\n")
         
         if len(files) > 20:
-            result += f"- ... and {len(files) - 20} more files\n"
+            parts.append(f"- ... and {len(files) - 20} more files\n")
     
-    result += "\n"
-    return result
+    parts.append("\n")
+    return "".join(parts)
 
@@ -284,8 +284,7 @@ def tile_images(input_obj: Union['AttachmentCollection', Attachment]) -> Attachm
             # Convert tiled image to base64
             buffer = io.BytesIO()
             tiled_img.save(buffer, format='PNG')
-            buffer.seek(0)
-            img_data = base64.b64encode(buffer.read()).decode()
+            img_data = base64.b64encode(buffer.getbuffer()).decode('ascii')
             
             # Determine output format based on input format
             if isinstance(input_obj, Attachment) and input_obj.images and input_obj.images[0].startswith('data:image/'):
@@ -377,8 +376,7 @@ def resize_images(att: Attachment) -> Attachment:
                 # Convert back to base64
                 buffer = io.BytesIO()
                 img_resized.save(buffer, format="PNG")
-                buffer.seek(0)
-                img_resized_b64 = base64.b64encode(buffer.read()).decode()
+                img_resized_b64 = base64.b64encode(buffer.getbuffer()).decode('ascii')
                 
                 # Return in the same format as input (data URL or raw base64)
                 if img_b64.startswith('data:image/'):
@@ -47,6 +47,8 @@ class Attachments:
     
     def _process_files(self, paths: tuple) -> None:
         """Process all input files through universal pipeline."""
+        self._prewarm_office_conversions(paths)
+        
         for path in paths:
             try:
                 # Create attachment and apply universal auto-pipeline
@@ -59,6 +61,8 @@ class Attachments:
                     
                     # Add directory map as first attachment if there are files
                     if file_paths:
+                        self._prewarm_office_conversions(file_paths)
+                        
                         # Create a summary attachment with directory info
                         summary_att = Attachment(path)
                         summary_att.text = result.metadata.get('directory_map', f"Directory: {path}")
@@ -115,6 +119,21 @@ class Attachments:
                 error_att.metadata = {'error': str(e), 'path': path}
                 self.attachments.append(error_att)
     
+    def _prewarm_office_conversions(self, paths) -> None:
+        """Batch the LibreOffice PDF conversions that Office image presenters will need."""
+        from .present import _prewarm_office_pdf_cache
+        
+        wanted = []
+        for path in paths:
+            parsed = Attachment(path)
+            if parsed.commands.get('images', 'true').lower() != 'false':
+                wanted.append(parsed.path)
+        
+        try:
+            _prewarm_office_pdf_cache(wanted)
+        except Exception:
+            pass  # Presenters fall back to converting one file at a time
+    
     def _auto_process(self, att: Attachment) -> Union[Attachment, AttachmentCollection]:
         """Enhanced auto-processing with processor discovery."""
         